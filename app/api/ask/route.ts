@@ -1,17 +1,43 @@
 import { NextRequest, NextResponse } from "next/server";
-import { searchRelevantChunks, openai } from "@/lib/supabase";
+import { withProfiling } from "@/lib/server/profiler";
+import { getOpenAI, searchRelevantChunks } from "@/lib/supabase";
+import { createTextContext, sha256, TextContext } from "@/lib/server/textContext";
+import { singleFlight } from "@/lib/server/singleFlight";
+import { increment, observe } from "@/lib/server/metrics";
+import { ChatSession, getSession, rememberRetrieval, RetrievedChunk } from "@/lib/server/sessions";
+import { runInBackground } from "@/lib/server/background";
+import { auditFlushDue, flushAudit, recordAudit } from "@/lib/server/audit";
+import { runShadow, ShadowInput, shouldShadow } from "@/lib/server/shadow";
+import { getCachedAnswer, rememberAnswer } from "@/lib/server/answerCache";
+import { claimSpeculation } from "@/lib/server/speculation";
+import { ASK_CONFIG_HASH, buildMessages, MATCH_COUNT, MATCH_THRESHOLD, pickChatModel, RECORD_RAW_SCORES } from "@/lib/server/askConfig";
 
 export const runtime = "nodejs";
 export const dynamic = "force-dynamic";
 
-const CHAT_MODEL = process.env.OPENAI_CHAT_MODEL || "gpt-3.5-turbo";
+type AskResult = { status: number; body: Record<string, unknown>; model?: string; scores?: number[]; shadow?: ShadowInput };
+type Source = { id: string; filename: string; similarity: number };
+
+// Events of a streamed ask, one JSON object per line (NDJSON)
+type AskEvent =
+    | { type: "sources"; sources: Source[] }
+    | { type: "delta"; text: string }
+    | { type: "done"; sessionId?: string }
+    | { type: "error"; status: number; error: string; sessionId?: string };
+type Emit = (event: AskEvent) => void;
 
 export async function POST(req: NextRequest) {
+    return withProfiling(req, "ask", () => handleAsk(req));
+}
+
+async function handleAsk(req: NextRequest) {
     try {
-        const body = await req.json().catch(() => ({} as { question?: string; projectId: string; }));
+        const body = await req.json().catch(() => ({} as { question?: string; projectId?: string; sessionId?: string; stream?: boolean; }));
 
         const question = typeof body.question === "string" ? body.question.trim() : "";
-        const projectId = typeof body.projectId === "string" ? body.projectId : "";
+        // A live session pins the project; otherwise fall back to a stateless ask
+        const session = typeof body.sessionId === "string" ? getSession(body.sessionId) : null;
+        const projectId = session?.projectId ?? (typeof body.projectId === "string" ? body.projectId : "");
 
         if (!question) {
             return NextResponse.json({ error: "Missing question" }, { status: 400 });
@@ -20,47 +46,193 @@ export async function POST(req: NextRequest) {
             return NextResponse.json({ error: "Missing projectId" }, { status: 400 });
         }
 
-// 1) Retrieve top-N chunks for this project
-    let chunks: Array<{ id: string; filename: string; content: string; similarity: number }> = [];
+    const questionCtx = createTextContext(question);
+    if (body.stream === true) return streamAsk(projectId, questionCtx, session);
+
+    const value = await respond(projectId, questionCtx, session);
+    return NextResponse.json(session ? { ...value.body, sessionId: session.id } : value.body, { status: value.status });
+    } catch (e: unknown) {
+        let msg = "Internal Server Error";
+        if (e instanceof Error) {
+            console.error("/api/ask fatal:", e.message);
+            msg = e.message;
+        } else {
+            console.error("/api/ask fatal:", e);
+        }
+        return NextResponse.json({ error: msg }, { status: 500 });
+    }
+}
+
+// Streamed ask: the leader emits its sources and then tokens as the model
+// produces them; cached or shared answers are emitted whole once ready
+function streamAsk(projectId: string, questionCtx: TextContext, session: ChatSession | null) {
+    const encoder = new TextEncoder();
+    // a client that disconnects must not fail the answer other askers share
+    let open = true;
+    return new Response(
+        new ReadableStream({
+            async start(controller) {
+                const send = (event: AskEvent) => {
+                    if (open) controller.enqueue(encoder.encode(JSON.stringify(event) + "\n"));
+                };
+                let streamed = false;
+                try {
+                    const value = await respond(projectId, questionCtx, session, (event) => {
+                        streamed = true;
+                        send(event);
+                    });
+                    if (value.status !== 200) {
+                        send({ type: "error", status: value.status, error: String(value.body.error ?? "Request failed"), sessionId: session?.id });
+                    } else {
+                        if (!streamed) {
+                            send({ type: "sources", sources: value.body.sources as Source[] });
+                            send({ type: "delta", text: String(value.body.answer) });
+                        }
+                        send({ type: "done", sessionId: session?.id });
+                    }
+                } catch (e: unknown) {
+                    console.error("/api/ask stream fatal:", e instanceof Error ? e.message : e);
+                    send({ type: "error", status: 500, error: e instanceof Error ? e.message : "Internal Server Error", sessionId: session?.id });
+                } finally {
+                    if (open) controller.close();
+                }
+            },
+            cancel() {
+                open = false;
+            },
+        }),
+        { headers: { "Content-Type": "application/x-ndjson; charset=utf-8", "Cache-Control": "no-store" } }
+    );
+}
+
+async function respond(projectId: string, questionCtx: TextContext, session: ChatSession | null, emit?: Emit) {
+// Recent answers are served from cache; identical concurrent questions
+// share one retrieval + completion
+    const key = sha256(JSON.stringify([ASK_CONFIG_HASH, projectId, questionCtx.hash()]));
+    const started = Date.now();
+    claimSpeculation(projectId, questionCtx.hash());
+    const cached = getCachedAnswer<AskResult>(key);
+    increment(cached ? "ask.answer_cache.hit" : "ask.answer_cache.miss");
+    const { value, shared } = cached
+        ? { value: cached, shared: true }
+        : await singleFlight(key, async () => {
+            const result = await answerQuestion(projectId, questionCtx, session, emit);
+            if (result.status === 200) rememberAnswer(key, projectId, { ...result, shadow: undefined });
+            return result;
+        });
+    if (!cached) increment(shared ? "ask.singleflight.shared" : "ask.singleflight.leader");
+
+// Audit is buffered in memory; batches are written after responding
+    const sources = Array.isArray(value.body.sources) ? (value.body.sources as Source[]) : [];
+    recordAudit({
+        at: started,
+        route: "ask",
+        projectId,
+        configHash: ASK_CONFIG_HASH,
+        questionHash: questionCtx.hash(),
+        model: value.model ?? null,
+        status: value.status,
+        latencyMs: Date.now() - started,
+        sources: sources.length,
+        topSimilarity: sources[0]?.similarity ?? null,
+        shared,
+        scores: value.scores ?? null,
+        latencyDeltaMs: null,
+        agreement: null,
+    });
+
+// Sampled answers are replayed against the shadow model; followers of a
+// shared answer are skipped so one question is shadowed once
+    const primary = value.shadow;
+    if (primary && !shared && shouldShadow()) {
+        runInBackground("shadow", () =>
+            runShadow(primary, {
+                projectId,
+                configHash: ASK_CONFIG_HASH,
+                questionHash: questionCtx.hash(),
+                sources: sources.length,
+                topSimilarity: sources[0]?.similarity ?? null,
+            })
+        );
+    }
+    if (auditFlushDue()) runInBackground("audit", flushAudit);
+
+    return value;
+}
+
+async function answerQuestion(
+    projectId: string,
+    questionCtx: TextContext,
+    session: ChatSession | null,
+    emit?: Emit
+): Promise<AskResult> {
+// 1) Retrieve top-N chunks for this project (reusing this session's earlier turns)
+    let chunks: RetrievedChunk[] = [];
+    let scores: number[] | undefined;
         try {
-            chunks = await searchRelevantChunks(projectId, question, 6, 0.90);
+            const cached = session?.retrievals.get(questionCtx.hash());
+            if (cached) increment("ask.session.retrieval_hit");
+            if (cached) {
+                chunks = cached;
+            } else if (RECORD_RAW_SCORES) {
+                // top-N with no threshold, filtered here: same chunks, plus the
+                // pre-threshold scores the replay tool needs
+                const raw = await searchRelevantChunks(projectId, questionCtx, MATCH_COUNT, -1);
+                scores = raw.map((c) => c.similarity);
+                chunks = raw.filter((c) => c.similarity >= MATCH_THRESHOLD);
+            } else {
+                chunks = await searchRelevantChunks(projectId, questionCtx, MATCH_COUNT, MATCH_THRESHOLD);
+            }
+            if (session && !cached) rememberRetrieval(session, questionCtx.hash(), chunks);
         } catch (err: unknown) {
             let msg = "Search Error";
             if (err instanceof Error) {
                 console.error("Supabase search error:", err?.message || err);
                 msg = err.message;
             }
-            return NextResponse.json({ error: "Search failed" }, { status: 502 });
+            return { status: 502, body: { error: "Search failed" } };
         }
 
 // Build short source list for the UI
-    const sources = (chunks || []).map((c) => ({
+    const sources: Source[] = (chunks || []).map((c) => ({
         id: c.id,
         filename: c.filename,
         similarity: c.similarity,
     }));
+    emit?.({ type: "sources", sources });
 
-// 2) Construct prompt
-    const contextText =
-    chunks.length > 0
-    ? chunks.map((c, i) => `Source ${i + 1}: ${c.filename}\n${c.content}`).join("\n\n")
-    : "(no retrieved context)";
-
-    const system =
-        "You are a precise coding assistant. Prefer using the provided project sources. If unsure, say so. Keep answers concise and cite file names when helpful.";
-    const user = `Use the following project context to answer the question.\n\nContext:\n${contextText}\n\nQuestion: ${question}\n\nAnswer clearly.`;
+// 2) Construct prompt; retrieval strength picks the cascade stage
+    const messages = buildMessages(questionCtx.text, chunks);
+    const { model, stage } = pickChatModel(chunks[0]?.similarity ?? null);
+    increment(`ask.cascade.${stage}`);
 
-// 3) Ask OpenAI
-    let completion;
+// 3) Ask OpenAI; a streaming caller gets tokens as they arrive
+    let answer = "";
+    const chatStarted = Date.now();
         try {
-            completion = await openai.chat.completions.create({
-                model: CHAT_MODEL,
-                temperature: 0.2,
-                messages: [
-                { role: "system", content: system },
-                { role: "user", content: user },
-                ],
-            });
+            if (emit) {
+                const stream = await getOpenAI().chat.completions.create({
+                    model,
+                    temperature: 0.2,
+                    messages,
+                    stream: true,
+                });
+                for await (const part of stream) {
+                    const text = part.choices[0]?.delta?.content;
+                    if (!text) continue;
+                    if (!answer) observe("ask.chat.first_token_ms", Date.now() - chatStarted);
+                    answer += text;
+                    emit({ type: "delta", text });
+                }
+                if (!answer) emit({ type: "delta", text: "No answer." });
+            } else {
+                const completion = await getOpenAI().chat.completions.create({
+                    model,
+                    temperature: 0.2,
+                    messages,
+                });
+                answer = completion.choices[0]?.message?.content ?? "";
+            }
         } catch (err: unknown) {
             let msg = "OpenAI request failed";
             if (err instanceof Error) {
@@ -69,20 +241,12 @@ export async function POST(req: NextRequest) {
             } else {
                 console.error("OpenAI chat error:", err);
             }
-            return NextResponse.json({ error: msg }, { status: 502 });
+            return { status: 502, body: { error: msg } };
         }
 
-    const answer = completion.choices[0]?.message?.content ?? "No answer.";
+    const chatMs = Date.now() - chatStarted;
+    observe(emit ? "ask.chat.stream_total_ms" : "ask.chat.total_ms", chatMs);
+    answer ||= "No answer.";
 
-    return NextResponse.json({ answer, sources });
-    } catch (e: unknown) {
-        let msg = "Internal Server Error";
-        if (e instanceof Error) {
-            console.error("/api/ask fatal:", e.message);
-            msg = e.message;
-        } else {
-            console.error("/api/ask fatal:", e);
-        }
-        return NextResponse.json({ error: msg }, { status: 500 });
-    }
-}
\ No newline at end of file
+    return { status: 200, body: { answer, sources }, model, scores, shadow: { messages, answer, chatMs } };
+}
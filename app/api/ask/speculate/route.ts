@@ -0,0 +1,40 @@
+import { NextRequest, NextResponse } from "next/server";
+import { embedQuery, searchRelevantChunks } from "@/lib/supabase";
+import { createTextContext } from "@/lib/server/textContext";
+import { getSession, rememberRetrieval } from "@/lib/server/sessions";
+import { noteSpeculation } from "@/lib/server/speculation";
+import { MATCH_COUNT, MATCH_THRESHOLD, RECORD_RAW_SCORES } from "@/lib/server/askConfig";
+
+export const runtime = "nodejs";
+export const dynamic = "force-dynamic";
+
+// Called while the user is still typing: embed the draft question and, with a
+// session, run its retrieval into the session cache so the real ask skips both.
+// When raw scores are audited the ask must search itself, so only the
+// embedding is warmed.
+export async function POST(req: NextRequest) {
+    const body = await req.json().catch(() => ({} as { question?: string; projectId?: string; sessionId?: string }));
+    const question = typeof body.question === "string" ? body.question.trim() : "";
+    const session = typeof body.sessionId === "string" ? getSession(body.sessionId) : null;
+    const projectId = session?.projectId ?? (typeof body.projectId === "string" ? body.projectId : "");
+    if (!question || !projectId) {
+        return NextResponse.json({ error: "Missing question or projectId" }, { status: 400 });
+    }
+
+    const questionCtx = createTextContext(question);
+    noteSpeculation(projectId, questionCtx.hash());
+    try {
+        if (session && !RECORD_RAW_SCORES) {
+            if (!session.retrievals.get(questionCtx.hash())) {
+                const chunks = await searchRelevantChunks(projectId, questionCtx, MATCH_COUNT, MATCH_THRESHOLD);
+                rememberRetrieval(session, questionCtx.hash(), chunks);
+            }
+        } else {
+            await embedQuery(questionCtx);
+        }
+    } catch (e: unknown) {
+        // best effort: the real ask simply does the work itself
+        console.error("/api/ask/speculate error:", e instanceof Error ? e.message : e);
+    }
+    return NextResponse.json({ ok: true });
+}
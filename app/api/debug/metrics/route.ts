@@ -0,0 +1,23 @@
+import { NextRequest, NextResponse } from "next/server";
+import { isAdmin } from "@/lib/server/profiler";
+import { metricsSnapshot, timingsSnapshot } from "@/lib/server/metrics";
+import { embeddingCacheStats } from "@/lib/server/embeddingCache";
+import { clientRegistryStats } from "@/lib/server/clientRegistry";
+import { answerCacheStats } from "@/lib/server/answerCache";
+
+export const runtime = "nodejs";
+export const dynamic = "force-dynamic";
+
+export async function GET(req: NextRequest) {
+    if (!isAdmin(req)) {
+        return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
+    }
+
+    return NextResponse.json({
+        counters: metricsSnapshot(),
+        timings: timingsSnapshot(),
+        embeddingCache: embeddingCacheStats(),
+        clients: clientRegistryStats(),
+        answerCache: answerCacheStats(),
+    });
+}
@@ -0,0 +1,29 @@
+import { NextRequest, NextResponse } from "next/server";
+import { isAdmin, listProfiles, readProfile } from "@/lib/server/profiler";
+
+export const runtime = "nodejs";
+export const dynamic = "force-dynamic";
+
+// GET /api/debug/profiles          -> list captures (newest first)
+// GET /api/debug/profiles?id=<id>  -> download one .cpuprofile
+export async function GET(req: NextRequest) {
+    if (!isAdmin(req)) {
+        return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
+    }
+
+    const id = req.nextUrl.searchParams.get("id");
+    if (!id) {
+        return NextResponse.json({ profiles: await listProfiles() });
+    }
+
+    const data = await readProfile(id);
+    if (!data) {
+        return NextResponse.json({ error: "Profile not found" }, { status: 404 });
+    }
+    return new NextResponse(new Uint8Array(data), {
+        headers: {
+            "Content-Type": "application/json",
+            "Content-Disposition": `attachment; filename="${id}.cpuprofile"`,
+        },
+    });
+}
@@ -0,0 +1,21 @@
+import { NextRequest, NextResponse } from "next/server";
+import { createSession } from "@/lib/server/sessions";
+import { CHAT_MODEL, MATCH_COUNT, MATCH_THRESHOLD } from "@/lib/server/askConfig";
+
+export const runtime = "nodejs";
+export const dynamic = "force-dynamic";
+
+// Open a chat session once per project; later asks send only sessionId + question
+export async function POST(req: NextRequest) {
+    const body = await req.json().catch(() => ({} as { projectId?: string }));
+    const projectId = typeof body.projectId === "string" ? body.projectId : "";
+    if (!projectId) {
+        return NextResponse.json({ error: "Missing projectId" }, { status: 400 });
+    }
+
+    const session = createSession(projectId);
+    return NextResponse.json({
+        sessionId: session.id,
+        config: { model: CHAT_MODEL, matchCount: MATCH_COUNT, threshold: MATCH_THRESHOLD },
+    });
+}
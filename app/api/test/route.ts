@@ -1,12 +1,12 @@
 import { NextResponse } from "next/server";
-import { supabase } from "@/lib/supabase";
+import { getSupabase } from "@/lib/supabase";
 
 export const runtime = "nodejs";
 export const dynamic = "force-dynamic";
 
 export async function GET() {
     try {
-        const { data, error } = await supabase.from("documents").select("*").limit(1);
+        const { data, error } = await getSupabase().from("documents").select("id, project_id, path, filename, sha256").limit(1);
         if (error) {
             console.error("Test fetch error:", error);
             return NextResponse.json({ error: error.message }, { status: 500 });
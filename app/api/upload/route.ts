@@ -1,6 +1,7 @@
 // app/api/upload/route.ts
 import { NextRequest, NextResponse } from "next/server";
-import { writeFile, mkdir } from "node:fs/promises";
+import { withProfiling } from "@/lib/server/profiler";
+import { mkdir } from "node:fs/promises";
 import path from "node:path";
 import crypto from "node:crypto";
 import AdmZip from "adm-zip";
@@ -9,6 +10,10 @@ export const runtime = "nodejs";
 export const dynamic = "force-dynamic";
 
 export async function POST(req: NextRequest) {
+    return withProfiling(req, "upload", () => handleUpload(req));
+}
+
+async function handleUpload(req: NextRequest) {
     try {
         const form = await req.formData();
         const file = form.get("file") as File | null;
@@ -27,91 +32,49 @@ export async function POST(req: NextRequest) {
     // 1) Make a new local projectId (don't depend on DB here)
     const projectId = crypto.randomUUID();
 
-    // 2) Ensure target folder - use /tmp for Vercel compatibility
-    // On Vercel, only /tmp is writable (ephemeral storage)
+    // 2) Target folder for the extracted tree (local only)
+    // On Vercel, only /tmp is writable and nothing persists, so files stay in memory
     const isVercel = process.env.VERCEL === "1";
     const uploadBase = isVercel ? "/tmp" : path.join(process.cwd(), "uploaded");
     const root = path.join(uploadBase, projectId);
-    await mkdir(root, { recursive: true });
 
-    // 3) Save the uploaded zip
-    const arrayBuffer = await file.arrayBuffer();
-    const buffer = Buffer.from(arrayBuffer);
-    const zipPath = path.join(root, "upload.zip");
-    await writeFile(zipPath, buffer);
+    // 3) Open the uploaded zip straight from memory (no temp copy on disk)
+    const buffer = Buffer.from(await file.arrayBuffer());
+    let zip: AdmZip;
 
     // 4) Extract
     try {
-        const zip = new AdmZip(zipPath);
-        zip.extractAllTo(root, true);
+        zip = new AdmZip(buffer);
+        if (!isVercel) {
+            await mkdir(root, { recursive: true });
+            zip.extractAllTo(root, true);
+        }
         } catch (e) {
         console.error("ZIP extract error:", e);
         return NextResponse.json({ error: "Invalid ZIP or extract failed." }, { status: 400 });
     }
 
-    // 5) On Vercel, immediately process the files since /tmp is ephemeral
-    // Files won't persist across function invocations
+    // 5) On Vercel, index the zip entries right away from memory
+    // Nothing written here would persist across function invocations
     if (isVercel) {
         try {
             // Import and call embedding logic directly
-            const { promises: fs } = await import("node:fs");
-            const { getFilesRecursively } = await import("@/lib/server/getFilesRecursively");
-            const { embedFileToProject, supabase } = await import("@/lib/supabase");
-            
-            const ALLOWED = [
-                ".js",".ts",".jsx",".tsx",".json",".md",".mdx",".yml",".yaml",".toml",
-                ".py",".rs",".go",".java",".kt",".rb",".php",".sh",".css",".scss",".html",
-                ".c",".h",".cpp"
-            ];
-            
-            function shouldIndex(file: string) {
-                const ext = path.extname(file).toLowerCase();
-                return ALLOWED.includes(ext);
-            }
-            
-            // Ensure project exists in DB
-            const { data: existing, error: selErr } = await supabase
-                .from("projects")
-                .select("id")
-                .eq("id", projectId)
-                .maybeSingle();
+            const { ensureProject, indexZipEntries } = await import("@/lib/server/indexProject");
 
-            if (selErr) {
-                console.error("Supabase select(projects) error:", selErr);
-                return NextResponse.json({ error: `DB read failed: ${selErr.message}` }, { status: 500 });
+            // Ensure project exists in DB
+            const dbError = await ensureProject(projectId);
+            if (dbError) {
+                return NextResponse.json({ error: dbError }, { status: 500 });
             }
 
-            if (!existing) {
-                const { error: insErr } = await supabase
-                    .from("projects")
-                    .insert({ id: projectId, name: `Project ${new Date().toISOString()}` });
-
-                if (insErr && insErr.code !== "23505") {
-                    console.error("Supabase insert(projects) error:", insErr);
-                    return NextResponse.json({ error: `DB insert failed: ${insErr.message}` }, { status: 500 });
-                }
-            }
-            
             // Process files
-            const allFiles = await getFilesRecursively(root);
-            const files = allFiles.filter(shouldIndex);
-            
-            let inserted = 0;
-            let skipped = 0;
-            
-            for (const file of files) {
-                const content = await fs.readFile(file, "utf-8");
-                const filename = path.basename(file);
-                const res = await embedFileToProject(projectId, file, filename, content);
-                inserted += res.inserted;
-                skipped += res.skipped;
-            }
-            
+            const { files, inserted, skipped } = await indexZipEntries(projectId, zip, root);
+
             return NextResponse.json({ 
                 projectId, 
                 folder: root,
                 embedded: true,
-                files: files.length,
+                files,
                 inserted,
                 skipped
             });
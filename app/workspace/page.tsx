@@ -6,7 +6,17 @@ import ChatPanel, { Message, Source } from "@/components/ChatPanel";
 import FileUpload from "@/components/FileUpload";
 import { IconArrowLeft } from "@tabler/icons-react";
 
-type ApiResponse = { answer?: string; error?: string; sources?: Source[] };
+type ApiResponse = { answer?: string; error?: string; sources?: Source[]; sessionId?: string };
+type AskEvent =
+  | { type: "sources"; sources: Source[] }
+  | { type: "delta"; text: string }
+  | { type: "done"; sessionId?: string }
+  | { type: "error"; error: string; sessionId?: string };
+type ChatSession = { projectId: string; sessionId: string };
+
+// Drafts this long, left alone this long, are sent ahead for speculative retrieval
+const SPECULATE_MIN_CHARS = 12;
+const SPECULATE_DEBOUNCE_MS = 600;
 
 export default function WorkspacePage() {
 const router = useRouter();
@@ -14,6 +24,93 @@ const [messages, setMessages] = useState<Message[]>([]);
 const [input, setInput] = useState("");
 const [sending, setSending] = useState(false);
 const inputRef = useRef<HTMLTextAreaElement>(null);
+const sessionRef = useRef<ChatSession | null>(null);
+const speculatedRef = useRef<{ text: string; controller: AbortController } | null>(null);
+
+// Open a chat session once per project; asks fall back to stateless if it fails
+const ensureSession = async (projectId: string) => {
+  if (sessionRef.current?.projectId === projectId) return sessionRef.current.sessionId;
+  try {
+    const res = await fetch("/api/session", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ projectId }),
+    });
+    const data = (await res.json()) as { sessionId?: string };
+    if (!res.ok || !data.sessionId) return undefined;
+    sessionRef.current = { projectId, sessionId: data.sessionId };
+    return data.sessionId;
+  } catch {
+    return undefined;
+  }
+};
+
+// While the user pauses typing, the server embeds and retrieves the draft so
+// sending it skips that work; a newer draft aborts the previous request
+useEffect(() => {
+  const draft = input.trim();
+  if (sending || draft.length < SPECULATE_MIN_CHARS) return;
+  const projectId = localStorage.getItem("ttc_project_id");
+  if (!projectId) return;
+
+  const timer = setTimeout(async () => {
+    if (speculatedRef.current?.text === draft) return;
+    speculatedRef.current?.controller.abort();
+    const controller = new AbortController();
+    speculatedRef.current = { text: draft, controller };
+    try {
+      const sessionId = await ensureSession(projectId);
+      await fetch("/api/ask/speculate", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ question: draft, projectId, sessionId }),
+        signal: controller.signal,
+      });
+    } catch {
+      // speculation is best effort
+    }
+  }, SPECULATE_DEBOUNCE_MS);
+  return () => clearTimeout(timer);
+  // eslint-disable-next-line react-hooks/exhaustive-deps
+}, [input, sending]);
+
+// Render a streamed answer (NDJSON events) into a new assistant message as it arrives
+const readAnswerStream = async (body: ReadableStream<Uint8Array>) => {
+  setMessages((prev) => [...prev, { role: "assistant", content: "" }]);
+  const update = (patch: (m: Message) => Message) =>
+    setMessages((prev) => [...prev.slice(0, -1), patch(prev[prev.length - 1])]);
+
+  const reader = body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffered = "";
+  let ended = false;
+  let returnedSession: string | undefined;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffered += value;
+    const lines = buffered.split("\n");
+    buffered = lines.pop() ?? "";
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line) as AskEvent;
+      if (event.type === "sources") {
+        update((m) => ({ ...m, sources: event.sources }));
+      } else if (event.type === "delta") {
+        update((m) => ({ ...m, content: m.content + event.text }));
+      } else if (event.type === "error") {
+        ended = true;
+        returnedSession = event.sessionId;
+        update((m) => ({ ...m, content: m.content ? `${m.content}\n\n${event.error}` : event.error }));
+      } else {
+        ended = true;
+        returnedSession = event.sessionId;
+      }
+    }
+  }
+  if (!ended) update((m) => ({ ...m, content: `${m.content}\n\n(answer interrupted)` }));
+  // only a final event says whether the server still knows the session
+  return { ended, sessionId: returnedSession };
+};
 
 // Cmd/Ctrl + K focuses the composer
 useEffect(() => {
@@ -42,17 +139,28 @@ const sendQuestion = async () => {
   setSending(true);
 
   try {
+    const sessionId = await ensureSession(projectId);
     const res = await fetch("/api/ask", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ question: trimmed, projectId }),
+      body: JSON.stringify({ question: trimmed, projectId, sessionId, stream: true }),
   });
 
+  // Answers stream as NDJSON; validation errors still come back as plain JSON
+  if (res.ok && res.body && res.headers.get("Content-Type")?.includes("application/x-ndjson")) {
+    const result = await readAnswerStream(res.body);
+    if (sessionId && result.ended && result.sessionId !== sessionId) sessionRef.current = null;
+    return;
+  }
+
   let data: ApiResponse = {};
   try {
     data = await res.json();
   } catch {}
 
+  // server no longer knows our session (expired or another instance): reopen next time
+  if (sessionId && data.sessionId !== sessionId) sessionRef.current = null;
+
   const answer =
   data?.answer ??
   data?.error ??
@@ -2,6 +2,7 @@
 
 import React, { useEffect, useRef, useState } from "react";
 import Button from "@/components/ui/Button";
+import { starters } from "@/lib/starters";
 
 export type Source = { id: string; filename: string; similarity?: number };
 export type Message = { role: "user" | "assistant"; content: string; sources?: Source[] };
@@ -16,13 +17,6 @@ inputRef?: React.Ref<HTMLTextAreaElement>;
 className?: string;
 }
 
-const starters = [
-"List all endpoints and their handlers",
-"Explain the main.cpp file",
-"Where are environment variables read?",
-"Show all React hooks used in the project",
-];
-
 export default function ChatPanel({
 messages,
 input,
@@ -63,6 +57,10 @@ onSend();
 
 const addStarter = (s: string) => setInput(s);
 
+// A streamed answer shows up as soon as its first token does
+const last = messages[messages.length - 1];
+const awaiting = sending && !(last?.role === "assistant" && last.content);
+
 return (
 <div className={`relative flex w-full flex-col min-h-[70vh] md:min-h-[65vh] lg:min-h-[70vh] ${className ?? ""}`}>
 {/* Subtle grid background */}
@@ -87,7 +85,7 @@ className="text-xs px-3 py-1.5 rounded-full bg-white/10 hover:bg-white/15 cursor
 </div>
 </div>
 ) : (
-messages.map((m, i) => (
+messages.map((m, i) => m.role === "assistant" && !m.content ? null : (
 <div key={i} className={`flex ${m.role === "user" ? "justify-end" : "justify-start"}`}>
 <div
 className={`max-w-[92%] md:max-w-[75%] whitespace-pre-wrap rounded-2xl px-4 py-3 text-sm leading-relaxed ${
@@ -120,7 +118,7 @@ title={s.filename}
 )}
 
 {/* Loading indicator */}
-{sending && (
+{awaiting && (
 <div className="flex justify-start">
 <div className="rounded-2xl px-4 py-3 bg-white/5 border border-white/10 backdrop-blur">
 <div className="flex space-x-1.5">
@@ -1,3 +1,16 @@
 import OpenAI from "openai";
+import { acquireClient } from "./server/clientRegistry";
+import { getSecret } from "./server/secrets";
 
-export const openai = new OpenAI({ apiKey: process.env.OPENAI_API_KEY! });
\ No newline at end of file
+// Every module resolves OpenAI through the registry at call time, so the ask,
+// embed and upload routes share a single client per process, and a rotated
+// key (see secrets.ts) yields a fresh client on the next call. OPENAI_BASE_URL
+// points it at any OpenAI-compatible server (e.g. a local stub for testing).
+export function getOpenAI() {
+  const settings = {
+    apiKey: getSecret("OPENAI_API_KEY")!,
+    baseURL: process.env.OPENAI_BASE_URL || undefined,
+    timeout: 10000,
+  };
+  return acquireClient("openai", settings, () => new OpenAI(settings));
+}
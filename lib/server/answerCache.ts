@@ -0,0 +1,40 @@
+// lib/server/answerCache.ts
+import { createLruCache, envNumber, LruCache } from "./lruCache";
+
+// Recent /api/ask answers, shared by every session on this instance.
+// Keys already carry ASK_CONFIG_HASH, so a settings change never serves an
+// answer produced under the old ones. Entries expire ANSWER_CACHE_TTL_MS after
+// they were stored; beyond ANSWER_CACHE_MAX the least recently used are
+// evicted. Either set to 0 disables the cache. Re-indexing a project drops its
+// answers.
+
+const TTL_MS = envNumber("ANSWER_CACHE_TTL_MS", 10 * 60 * 1000);
+const MAX_ENTRIES = envNumber("ANSWER_CACHE_MAX", 500);
+
+type Entry = { projectId: string; value: unknown };
+
+const globalRef = globalThis as typeof globalThis & { __ttcAnswerCache?: LruCache<Entry> };
+const entries = (globalRef.__ttcAnswerCache ??= createLruCache<Entry>({
+  maxEntries: MAX_ENTRIES,
+  ttlMs: TTL_MS,
+  refreshOnRead: false,
+}));
+
+export function getCachedAnswer<T>(key: string) {
+  return (entries.get(key)?.value as T | undefined) ?? null;
+}
+
+export function rememberAnswer<T>(key: string, projectId: string, value: T) {
+  if (MAX_ENTRIES <= 0 || TTL_MS <= 0) return;
+  entries.set(key, { projectId, value });
+}
+
+export function forgetProjectAnswers(projectId: string) {
+  for (const [key, entry] of entries.entries()) {
+    if (entry.projectId === projectId) entries.delete(key);
+  }
+}
+
+export function answerCacheStats() {
+  return { entries: entries.count, maxEntries: MAX_ENTRIES, ttlMs: TTL_MS };
+}
@@ -0,0 +1,70 @@
+// lib/server/artifactCache.ts
+import { mkdir, readFile, rename, writeFile } from "node:fs/promises";
+import path from "node:path";
+import { increment, observe } from "./metrics";
+
+// Content-addressed on-disk artifacts written by `npm run prefetch`:
+// <dir>/<kind>/<model>/<sha256>.json plus manifest.json. The server reads
+// them before calling the API; `npm run build` runs prefetch first and the
+// dir ships with the routes that embed questions (see next.config). The
+// manifest is read once per process, so a miss costs a set lookup, not a read.
+
+export const ARTIFACT_DIR = process.env.ARTIFACT_CACHE_DIR || path.join(process.cwd(), ".cache", "artifacts");
+
+// manifest.json sections that list artifacts look like { model, artifacts: [{ hash }] }
+type ManifestSection = { model?: string; artifacts?: { hash: string }[] };
+
+function artifactPath(kind: string, model: string, hash: string) {
+  return path.join(ARTIFACT_DIR, kind, model.replace(/[^\w.-]/g, "_"), `${hash}.json`);
+}
+
+const keyOf = (kind: string, model: string, hash: string) => `${kind}/${model}/${hash}`;
+
+async function loadIndex() {
+  const index = new Set<string>();
+  try {
+    const manifest = JSON.parse(await readFile(path.join(ARTIFACT_DIR, "manifest.json"), "utf-8")) as Record<string, unknown>;
+    for (const [kind, section] of Object.entries(manifest)) {
+      const { model, artifacts } = (section ?? {}) as ManifestSection;
+      if (!model || !Array.isArray(artifacts)) continue;
+      for (const a of artifacts) index.add(keyOf(kind, model, a.hash));
+    }
+  } catch {
+    // no prefetch ran for this build: every lookup is a miss
+  }
+  return index;
+}
+
+// Survive Next dev hot reloads: one index per process, not per module copy
+const globalRef = globalThis as typeof globalThis & { __ttcArtifactIndex?: Promise<Set<string>> };
+
+export async function readArtifact<T>(kind: string, model: string, hash: string): Promise<T | null> {
+  const index = await (globalRef.__ttcArtifactIndex ??= loadIndex());
+  if (!index.has(keyOf(kind, model, hash))) {
+    increment(`artifact.${kind}.miss`);
+    return null;
+  }
+  const started = performance.now();
+  try {
+    const value = JSON.parse(await readFile(artifactPath(kind, model, hash), "utf-8")) as T;
+    observe(`artifact.${kind}.load_ms`, performance.now() - started);
+    increment(`artifact.${kind}.hit`);
+    return value;
+  } catch {
+    increment(`artifact.${kind}.miss`);
+    return null;
+  }
+}
+
+export async function writeArtifact(kind: string, model: string, hash: string, value: unknown) {
+  const file = artifactPath(kind, model, hash);
+  await mkdir(path.dirname(file), { recursive: true });
+  await writeFile(`${file}.tmp`, JSON.stringify(value));
+  await rename(`${file}.tmp`, file);
+  return file;
+}
+
+export async function writeManifest(manifest: unknown) {
+  await mkdir(ARTIFACT_DIR, { recursive: true });
+  await writeFile(path.join(ARTIFACT_DIR, "manifest.json"), JSON.stringify(manifest, null, 2));
+}
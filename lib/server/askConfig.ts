@@ -0,0 +1,49 @@
+// lib/server/askConfig.ts
+import type { ChatCompletionMessageParam } from "openai/resources/chat/completions";
+import { envNumber } from "./lruCache";
+import { sha256 } from "./textContext";
+
+// Retrieval + chat settings shared by /api/ask, /api/session and scripts
+export const CHAT_MODEL = process.env.OPENAI_CHAT_MODEL || "gpt-3.5-turbo";
+export const MATCH_COUNT = 6;
+export const MATCH_THRESHOLD = 0.90;
+
+// Keep pre-threshold retrieval scores in the audit log for threshold replay
+export const RECORD_RAW_SCORES = process.env.AUDIT_RAW_SCORES === "1";
+
+// Model cascade: when retrieval is clearly strong, a cheaper chat model is
+// enough. Questions whose top similarity lands within CASCADE_MARGIN of the
+// threshold (or below it) escalate to CHAT_MODEL. Off unless a cheap model is set.
+export const CHEAP_CHAT_MODEL = process.env.OPENAI_CHAT_MODEL_CHEAP || "";
+export const CASCADE_MARGIN = envNumber("CASCADE_MARGIN", 0.03);
+
+// Identifies the settings an answer was produced under (dedupe keys, audit)
+export const ASK_CONFIG_HASH = sha256(
+  JSON.stringify([CHAT_MODEL, CHEAP_CHAT_MODEL, CASCADE_MARGIN, MATCH_COUNT, MATCH_THRESHOLD])
+).slice(0, 16);
+
+export function pickChatModel(topSimilarity: number | null, threshold = MATCH_THRESHOLD, margin = CASCADE_MARGIN) {
+  if (CHEAP_CHAT_MODEL && topSimilarity !== null && topSimilarity >= threshold + margin) {
+    return { model: CHEAP_CHAT_MODEL, stage: "cheap" as const };
+  }
+  return { model: CHAT_MODEL, stage: "full" as const };
+}
+
+export function buildMessages(
+  question: string,
+  chunks: { filename: string; content: string }[]
+): ChatCompletionMessageParam[] {
+  const contextText =
+    chunks.length > 0
+      ? chunks.map((c, i) => `Source ${i + 1}: ${c.filename}\n${c.content}`).join("\n\n")
+      : "(no retrieved context)";
+
+  const system =
+    "You are a precise coding assistant. Prefer using the provided project sources. If unsure, say so. Keep answers concise and cite file names when helpful.";
+  const user = `Use the following project context to answer the question.\n\nContext:\n${contextText}\n\nQuestion: ${question}\n\nAnswer clearly.`;
+
+  return [
+    { role: "system", content: system },
+    { role: "user", content: user },
+  ];
+}
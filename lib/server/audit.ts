@@ -0,0 +1,249 @@
+// lib/server/audit.ts
+import { appendFileSync, mkdirSync } from "node:fs";
+import { appendFile, mkdir, readdir, readFile, stat } from "node:fs/promises";
+import path from "node:path";
+import { envNumber } from "./lruCache";
+import { increment } from "./metrics";
+
+// Batched, column-oriented audit log of answered questions.
+// Records are buffered in memory and flushed in batches; each flushed batch
+// is one JSON line holding one array per field, so a file is cheap to write
+// and cheap to scan column by column. Files roll over by size and age.
+// Batches are written when enough records are buffered, every AUDIT_FLUSH_MS
+// regardless of traffic, and synchronously on shutdown.
+// Questions are stored as hashes, never as raw text.
+
+const isVercel = process.env.VERCEL === "1";
+const AUDIT_DIR =
+  process.env.AUDIT_DIR || (isVercel ? "/tmp/ttc-audit" : path.join(process.cwd(), ".audit"));
+const BATCH_SIZE = Number(process.env.AUDIT_BATCH_SIZE) || 200;
+const FLUSH_MS = Number(process.env.AUDIT_FLUSH_MS) || 10_000;
+const BUFFER_MAX = Number(process.env.AUDIT_BUFFER_MAX) || 10_000;
+const ROTATE_BYTES = Number(process.env.AUDIT_ROTATE_BYTES) || 16 * 1024 * 1024;
+const ROTATE_MS = Number(process.env.AUDIT_ROTATE_MS) || 60 * 60 * 1000;
+
+// Shadow answers whose embeddings sit below this cosine count as a disagreement
+export const SHADOW_AGREEMENT_MIN = envNumber("SHADOW_AGREEMENT_MIN", 0.9);
+
+export type AuditRecord = {
+  at: number;
+  route: string;
+  projectId: string;
+  configHash: string;
+  questionHash: string;
+  model: string | null;
+  status: number;
+  latencyMs: number;
+  sources: number;
+  topSimilarity: number | null;
+  shared: boolean;
+  // pre-threshold top-N similarities, when AUDIT_RAW_SCORES=1
+  scores: number[] | null;
+  // shadow rows only: candidate minus primary chat latency, answer cosine
+  latencyDeltaMs: number | null;
+  agreement: number | null;
+};
+
+type AuditBatch = { rows: number; columns: { [K in keyof AuditRecord]: AuditRecord[K][] } };
+
+const FIELDS: (keyof AuditRecord)[] = [
+  "at", "route", "projectId", "configHash", "questionHash", "model",
+  "status", "latencyMs", "sources", "topSimilarity", "shared", "scores",
+  "latencyDeltaMs", "agreement",
+];
+
+type AuditState = {
+  buffer: AuditRecord[];
+  lastFlushAt: number;
+  flushing: Promise<void> | null;
+  current: { file: string; openedAt: number; bytes: number } | null;
+};
+
+// Survive Next dev hot reloads: one buffer, timer and set of exit hooks per
+// process, not per module copy
+const globalRef = globalThis as typeof globalThis & { __ttcAudit?: AuditState };
+const state = (globalRef.__ttcAudit ??= startAudit());
+
+export function recordAudit(record: AuditRecord) {
+  if (state.buffer.length >= BUFFER_MAX) {
+    increment("audit.shed");
+    return;
+  }
+  state.buffer.push(record);
+}
+
+export function auditFlushDue() {
+  const { buffer, lastFlushAt } = state;
+  return buffer.length >= BATCH_SIZE || (buffer.length > 0 && Date.now() - lastFlushAt >= FLUSH_MS);
+}
+
+function toBatch(records: AuditRecord[]): AuditBatch {
+  const columns = Object.fromEntries(FIELDS.map((f) => [f, records.map((r) => r[f])]));
+  return { rows: records.length, columns: columns as AuditBatch["columns"] };
+}
+
+function needsRotation(incoming: number, now: number) {
+  const { current } = state;
+  return !current || current.bytes + incoming > ROTATE_BYTES || now - current.openedAt > ROTATE_MS;
+}
+
+async function targetFile(incoming: number) {
+  const now = Date.now();
+  if (needsRotation(incoming, now)) {
+    await mkdir(AUDIT_DIR, { recursive: true });
+    state.current = { file: path.join(AUDIT_DIR, `audit-${now}.jsonl`), openedAt: now, bytes: 0 };
+  }
+  return state.current!;
+}
+
+export function flushAudit(): Promise<void> {
+  if (state.flushing) return state.flushing;
+  state.flushing = (async () => {
+    while (state.buffer.length > 0) {
+      const records = state.buffer.slice(0, BATCH_SIZE);
+      state.buffer = state.buffer.slice(records.length);
+      const line = JSON.stringify(toBatch(records)) + "\n";
+      const target = await targetFile(Buffer.byteLength(line));
+      await appendFile(target.file, line);
+      target.bytes += Buffer.byteLength(line);
+      increment("audit.flushed", records.length);
+    }
+    state.lastFlushAt = Date.now();
+  })().finally(() => {
+    state.flushing = null;
+  });
+  return state.flushing;
+}
+
+// Last-chance write when the process is going away; async work may not run
+function flushAuditSync() {
+  if (state.buffer.length === 0) return;
+  try {
+    const line = JSON.stringify(toBatch(state.buffer)) + "\n";
+    const now = Date.now();
+    if (needsRotation(Buffer.byteLength(line), now)) {
+      mkdirSync(AUDIT_DIR, { recursive: true });
+      state.current = { file: path.join(AUDIT_DIR, `audit-${now}.jsonl`), openedAt: now, bytes: 0 };
+    }
+    appendFileSync(state.current!.file, line);
+    state.current!.bytes += Buffer.byteLength(line);
+    state.buffer = [];
+  } catch (e: unknown) {
+    console.error("Audit flush on exit failed:", e instanceof Error ? e.message : e);
+  }
+}
+
+function startAudit(): AuditState {
+  const timer = setInterval(() => {
+    if (state.buffer.length === 0) return;
+    flushAudit().catch((e: unknown) => console.error("Audit flush failed:", e instanceof Error ? e.message : e));
+  }, FLUSH_MS);
+  timer.unref();
+
+  process.once("beforeExit", flushAuditSync);
+  process.once("SIGTERM", () => {
+    flushAuditSync();
+    // keep the default behaviour when nothing else (e.g. the Next server) handles it
+    if (process.listenerCount("SIGTERM") === 0) process.exit(143);
+  });
+
+  return { buffer: [], lastFlushAt: Date.now(), flushing: null, current: null };
+}
+
+// "--since" windows for the audit scripts: "36h" or "7d" to milliseconds.
+// A given value that doesn't parse is an error, not the default window.
+export function parseSince(value: string | undefined, fallback: string) {
+  const m = /^(\d+)([hd])$/.exec(value ?? fallback);
+  if (!m) throw new Error(`Invalid --since window: ${value ?? fallback} (use e.g. 36h or 7d)`);
+  return Number(m[1]) * (m[2] === "d" ? 24 : 1) * 3_600_000;
+}
+
+// Read records back, optionally limited to [from, to) by timestamp
+export async function readAudit(from = 0, to = Infinity) {
+  let names: string[];
+  try {
+    names = (await readdir(AUDIT_DIR)).filter((n) => /^audit-\d+\.jsonl$/.test(n)).sort();
+  } catch {
+    return [];
+  }
+
+  const rows: AuditRecord[] = [];
+  for (const name of names) {
+    const file = path.join(AUDIT_DIR, name);
+    // a file only holds records written after it was opened
+    if (Number(name.slice(6, -6)) >= to) continue;
+    if ((await stat(file)).mtimeMs < from) continue;
+
+    for (const line of (await readFile(file, "utf-8")).split("\n")) {
+      if (!line) continue;
+      const batch = JSON.parse(line) as AuditBatch;
+      // batches written before a field existed simply lack its column
+      const columns = batch.columns as Record<string, unknown[]>;
+      for (const f of FIELDS) columns[f] ??= new Array(batch.rows).fill(null);
+      for (let i = 0; i < batch.rows; i++) {
+        const at = batch.columns.at[i];
+        if (at < from || at >= to) continue;
+        const row = Object.fromEntries(FIELDS.map((f) => [f, batch.columns[f][i]]));
+        rows.push(row as AuditRecord);
+      }
+    }
+  }
+  return rows;
+}
+
+function percentile(sorted: number[], p: number) {
+  return sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p))] : null;
+}
+
+// Per-hour volume, failure rate (non-200), latency percentiles and the share
+// of questions answered by the cheap cascade model
+export function summarizeByHour(rows: AuditRecord[], cheapModel?: string) {
+  const hours = new Map<number, AuditRecord[]>();
+  for (const r of rows) {
+    const hour = Math.floor(r.at / 3_600_000) * 3_600_000;
+    const group = hours.get(hour) ?? [];
+    group.push(r);
+    hours.set(hour, group);
+  }
+
+  return [...hours.entries()]
+    .sort(([a], [b]) => a - b)
+    .map(([hour, group]) => {
+      const latencies = group.map((r) => r.latencyMs).sort((a, b) => a - b);
+      return {
+        hour: new Date(hour).toISOString(),
+        requests: group.length,
+        failureRate: group.filter((r) => r.status !== 200).length / group.length,
+        noContextRate: group.filter((r) => r.sources === 0).length / group.length,
+        cheapShare: cheapModel ? group.filter((r) => r.model === cheapModel).length / group.length : null,
+        p50LatencyMs: percentile(latencies, 0.5),
+        p95LatencyMs: percentile(latencies, 0.95),
+      };
+    });
+}
+
+// Shadow runs per candidate model: volume, failures, latency delta against
+// the primary and answer agreement
+export function summarizeShadow(rows: AuditRecord[], agreementMin = SHADOW_AGREEMENT_MIN) {
+  const models = new Map<string, AuditRecord[]>();
+  for (const r of rows) {
+    if (r.route !== "ask.shadow") continue;
+    const group = models.get(r.model ?? "") ?? [];
+    group.push(r);
+    models.set(r.model ?? "", group);
+  }
+
+  return [...models.entries()].map(([model, group]) => {
+    const ok = group.filter((r) => r.status === 200 && r.latencyDeltaMs !== null && r.agreement !== null);
+    const deltas = ok.map((r) => r.latencyDeltaMs!).sort((a, b) => a - b);
+    return {
+      model,
+      runs: group.length,
+      failureRate: (group.length - ok.length) / group.length,
+      p50DeltaMs: percentile(deltas, 0.5),
+      p95DeltaMs: percentile(deltas, 0.95),
+      meanAgreement: ok.length ? ok.reduce((s, r) => s + r.agreement!, 0) / ok.length : null,
+      disagreeRate: ok.length ? ok.filter((r) => r.agreement! < agreementMin).length / ok.length : null,
+    };
+  });
+}
@@ -0,0 +1,51 @@
+// lib/server/background.ts
+import { after } from "next/server";
+import { increment } from "./metrics";
+
+// Work that must not hold up the response (audit writes, shadow runs).
+// Tasks go through a bounded queue drained by a small worker pool; when the
+// queue is full new tasks are shed and counted instead of piling up.
+// Each task is also handed to after() so serverless instances stay alive
+// until it finishes.
+
+const MAX_PENDING = Number(process.env.BACKGROUND_QUEUE_MAX) || 100;
+const CONCURRENCY = Number(process.env.BACKGROUND_CONCURRENCY) || 2;
+
+type Job = { label: string; task: () => Promise<unknown>; resolve: () => void };
+
+const queue: Job[] = [];
+let running = 0;
+
+function pump() {
+  while (running < CONCURRENCY && queue.length > 0) {
+    const job = queue.shift()!;
+    running += 1;
+    job
+      .task()
+      .catch((e: unknown) => {
+        increment(`background.${job.label}.failed`);
+        console.error(`Background ${job.label} error:`, e instanceof Error ? e.message : e);
+      })
+      .finally(() => {
+        running -= 1;
+        job.resolve();
+        pump();
+      });
+  }
+}
+
+export function runInBackground(label: string, task: () => Promise<unknown>) {
+  if (queue.length >= MAX_PENDING) {
+    increment(`background.${label}.shed`);
+    return;
+  }
+  const done = new Promise<void>((resolve) => queue.push({ label, task, resolve }));
+  increment(`background.${label}.queued`);
+  pump();
+
+  try {
+    after(done);
+  } catch {
+    // outside a request scope (scripts) the task simply runs to completion
+  }
+}
@@ -0,0 +1,58 @@
+// lib/server/clientRegistry.ts
+import { createLruCache, LruCache } from "./lruCache";
+import { sha256 } from "./textContext";
+
+type Settings = Record<string, string | number | boolean | undefined>;
+
+type Entry = {
+  kind: string;
+  client: unknown;
+  createdAt: number;
+  lastUsedAt: number;
+};
+
+// Clients are resolved on every call, so one whose settings changed (a rotated
+// key) simply stops being asked for; it is dropped once idle this long
+const CLIENT_IDLE_MS = Number(process.env.CLIENT_IDLE_MS) || 30 * 60 * 1000;
+
+// Survive Next dev hot reloads: one registry per process, not per module copy
+const globalRef = globalThis as typeof globalThis & { __ttcClientRegistry?: LruCache<Entry> };
+const entries = (globalRef.__ttcClientRegistry ??= createLruCache<Entry>({ ttlMs: CLIENT_IDLE_MS }));
+
+// Secrets never appear in keys or stats; only their hash does
+function registryKey(kind: string, settings: Settings) {
+  const canonical = Object.keys(settings)
+    .sort()
+    .map((k) => `${k}=${settings[k] ?? ""}`)
+    .join("&");
+  return `${kind}:${sha256(canonical).slice(0, 16)}`;
+}
+
+// Resolve a client by kind + settings. Identical settings share one instance
+// per process.
+export function acquireClient<T>(kind: string, settings: Settings, create: () => T): T {
+  const key = registryKey(kind, settings);
+  entries.sweep();
+  let entry = entries.get(key);
+  if (!entry) {
+    const now = Date.now();
+    entry = { kind, client: create(), createdAt: now, lastUsedAt: now };
+    entries.set(key, entry);
+  }
+  entry.lastUsedAt = Date.now();
+  return entry.client as T;
+}
+
+// Remote models hold no weights in-process, so resident memory is reported
+// for the process as a whole next to the clients
+export function clientRegistryStats() {
+  return {
+    rssBytes: process.memoryUsage().rss,
+    clients: [...entries.entries()].map(([key, e]) => ({
+      key,
+      kind: e.kind,
+      createdAt: e.createdAt,
+      lastUsedAt: e.lastUsedAt,
+    })),
+  };
+}
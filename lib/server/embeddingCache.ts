@@ -0,0 +1,116 @@
+// lib/server/embeddingCache.ts
+import { createLruCache, LruCache } from "./lruCache";
+
+// Process-wide embedding cache under a memory budget.
+// Entries are kept in LRU order, evicted when the budget would be exceeded or
+// when idle too long, and loaded single-flight so concurrent requests for the
+// same text share one OpenAI call.
+
+const BUDGET_BYTES = Number(process.env.EMBEDDING_CACHE_BYTES) || 64 * 1024 * 1024;
+const IDLE_MS = Number(process.env.EMBEDDING_CACHE_IDLE_MS) || 30 * 60 * 1000;
+
+type CacheState = {
+  entries: LruCache<number[]>;
+  inflight: Map<string, Promise<number[]>>;
+  hits: number;
+  misses: number;
+  evictions: number;
+};
+
+// a JS number is 8 bytes; the key and bookkeeping are small next to 1536 floats
+function sizeOf(vector: number[]) {
+  return vector.length * 8 + 128;
+}
+
+const globalRef = globalThis as typeof globalThis & { __ttcEmbeddingCache?: CacheState };
+const state: CacheState = (globalRef.__ttcEmbeddingCache ??= {
+  entries: createLruCache<number[]>({
+    maxSize: BUDGET_BYTES,
+    sizeOf,
+    ttlMs: IDLE_MS,
+    onEvict: () => {
+      state.evictions += 1;
+    },
+  }),
+  inflight: new Map(),
+  hits: 0,
+  misses: 0,
+  evictions: 0,
+});
+
+function lookup(key: string) {
+  const vector = state.entries.get(key);
+  if (vector) {
+    state.hits += 1;
+    return Promise.resolve(vector);
+  }
+  const pending = state.inflight.get(key);
+  if (pending) state.hits += 1;
+  return pending;
+}
+
+function track(key: string, load: Promise<number[]>, store: boolean) {
+  const promise = load
+    .then((vector) => {
+      if (store) state.entries.set(key, vector);
+      return vector;
+    })
+    .finally(() => state.inflight.delete(key));
+  state.inflight.set(key, promise);
+  return promise;
+}
+
+// textHash is the sha256 of the embedded text (see TextContext.hash)
+export function getCachedEmbedding(
+  model: string,
+  textHash: string,
+  load: () => Promise<number[]>
+): Promise<number[]> {
+  const key = `${model}:${textHash}`;
+  const found = lookup(key);
+  if (found) return found;
+
+  state.misses += 1;
+  return track(key, load(), true);
+}
+
+// Batch form: only hashes neither cached nor in flight reach load(), once
+// each and in a single call; results come back in textHashes order. Indexing
+// passes store: false: its chunk vectors are rarely asked for again (reuse
+// goes through the database), so they only share in-flight loads and would
+// otherwise push warm query embeddings out of the budget.
+export function getCachedEmbeddings(
+  model: string,
+  textHashes: string[],
+  load: (missing: string[]) => Promise<number[][]>,
+  { store = true }: { store?: boolean } = {}
+): Promise<number[][]> {
+  const results = new Map<string, Promise<number[]>>();
+  const missing: string[] = [];
+
+  for (const hash of new Set(textHashes)) {
+    const found = lookup(`${model}:${hash}`);
+    if (found) results.set(hash, found);
+    else missing.push(hash);
+  }
+
+  if (missing.length > 0) {
+    state.misses += missing.length;
+    const batch = load(missing);
+    missing.forEach((hash, i) => results.set(hash, track(`${model}:${hash}`, batch.then((vs) => vs[i]), store)));
+  }
+
+  return Promise.all(textHashes.map((hash) => results.get(hash)!));
+}
+
+export function embeddingCacheStats() {
+  return {
+    entries: state.entries.count,
+    bytes: state.entries.size,
+    budgetBytes: BUDGET_BYTES,
+    inflight: state.inflight.size,
+    hits: state.hits,
+    misses: state.misses,
+    evictions: state.evictions,
+  };
+}
@@ -0,0 +1,51 @@
+// lib/server/fileFilter.ts
+import path from "node:path";
+
+const ALLOWED = [
+  ".js",".ts",".jsx",".tsx",".json",".md",".mdx",".yml",".yaml",".toml",
+  ".py",".rs",".go",".java",".kt",".rb",".php",".sh",".css",".scss",".html",
+  ".c",".h",".cpp"
+];
+
+export function shouldIndex(file: string) {
+  const ext = path.extname(file).toLowerCase();
+  return ALLOWED.includes(ext);
+}
+
+// Cheap content checks that flag files likely to only add noise to the index.
+// Each one runs before any chunking or embedding call. Checks marked advisory
+// are only ever counted: they can match real content, so they never skip.
+type Prefilter = { name: string; advisory?: boolean; skip: (file: string, content: string) => boolean };
+
+const MIN_CHARS = 20;
+const GENERATED_NAMES = new Set(["package-lock.json", "pnpm-lock.yaml", "composer.lock", "Pipfile.lock"]);
+
+const PREFILTERS: Prefilter[] = [
+  { name: "lockfile", skip: (file) => GENERATED_NAMES.has(path.basename(file)) },
+  { name: "short", advisory: true, skip: (_file, content) => content.trim().length < MIN_CHARS },
+  { name: "binary", skip: (_file, content) => content.includes("\u0000") },
+  {
+    name: "minified",
+    skip: (file, content) => {
+      // only code bundles; long unwrapped Markdown or one-line JSON is real content
+      if (!/\.(js|css)$/i.test(file)) return false;
+      if (/\.min\.(js|css)$/i.test(file)) return true;
+      // very long average lines only happen in bundled/minified output
+      const lines = content.length > 5000 ? content.split("\n").length : Infinity;
+      return content.length / lines > 500;
+    },
+  },
+];
+
+// PREFILTER_MODE: "report" (default) only counts what would be skipped so the
+// effect can be checked first; "enforce" skips; "off" disables the checks.
+export const PREFILTER_MODE = (process.env.PREFILTER_MODE || "report") as "enforce" | "report" | "off";
+
+// The first matching check, and whether it actually skips the file
+export function prefilter(file: string, content: string) {
+  if (PREFILTER_MODE === "off") return null;
+  for (const f of PREFILTERS) {
+    if (f.skip(file, content)) return { reason: f.name, skip: PREFILTER_MODE === "enforce" && !f.advisory };
+  }
+  return null;
+}
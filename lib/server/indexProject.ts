@@ -0,0 +1,153 @@
+// lib/server/indexProject.ts
+import { promises as fs } from "node:fs";
+import path from "node:path";
+import type AdmZip from "adm-zip";
+import { getFilesRecursively } from "./getFilesRecursively";
+import { prefilter, shouldIndex } from "./fileFilter";
+import { forgetProjectAnswers } from "./answerCache";
+import { forgetProjectRetrievals } from "./sessions";
+import { increment } from "./metrics";
+import { planResources } from "./resourcePlan";
+import { createTextContext } from "./textContext";
+import { createChunkBatcher, EmbedResult, getSupabase } from "../supabase";
+
+export { shouldIndex };
+
+// Ensure a row exists in projects (insert-if-missing).
+// Returns an error message for the caller to surface, or null on success.
+export async function ensureProject(projectId: string, projectName?: string) {
+  const { data: existing, error: selErr } = await getSupabase()
+    .from("projects")
+    .select("id")
+    .eq("id", projectId)
+    .maybeSingle();
+
+  if (selErr) {
+    console.error("Supabase select(projects) error:", selErr);
+    return `DB read failed: ${selErr.message}`;
+  }
+
+  if (!existing) {
+    const { error: insErr } = await getSupabase()
+      .from("projects")
+      .insert({ id: projectId, name: projectName ?? `Project ${new Date().toISOString()}` });
+
+    // Ignore duplicate-key races; otherwise surface the error
+    if (insErr && insErr.code !== "23505") {
+      console.error("Supabase insert(projects) error:", insErr);
+      return `DB insert failed: ${insErr.message}`;
+    }
+  }
+
+  return null;
+}
+
+// Run at most `max` tasks at once; the rest wait their turn
+function createLimiter(max: number) {
+  let active = 0;
+  const waiting: (() => void)[] = [];
+  return async <T>(task: () => Promise<T>) => {
+    while (active >= max) await new Promise<void>((resume) => waiting.push(resume));
+    active += 1;
+    try {
+      return await task();
+    } finally {
+      active -= 1;
+      waiting.shift()?.();
+    }
+  };
+}
+
+// Files of one project share a chunk batcher, so many small files go out in
+// one embedding call and one insert instead of one round trip each. Batches
+// are stored embedConcurrency at a time and file reads are capped at
+// fileConcurrency, both from the resource plan.
+export function createIndexer(projectId: string) {
+  const plan = planResources();
+  const batcher = createChunkBatcher(projectId, plan.embedConcurrency);
+  const limitReads = createLimiter(plan.fileConcurrency);
+
+  const indexContent = (file: string, content: string): Promise<EmbedResult> => {
+    const flagged = prefilter(file, content);
+    if (flagged) {
+      increment(`embed.prefilter.${flagged.reason}`);
+      if (flagged.skip) return Promise.resolve({ inserted: 0, skipped: 0 });
+    }
+    return batcher.add(file, path.basename(file), createTextContext(content));
+  };
+
+  return {
+    indexContent,
+    indexFile: async (file: string) => indexContent(file, await limitReads(() => fs.readFile(file, "utf-8"))),
+    flush: () => batcher.flush(),
+  };
+}
+
+// At most WINDOW files are pending at once so memory stays bounded on large
+// repos. The window slides: a new file starts as soon as any finishes, so one
+// slow batch no longer holds back the next 63 files. The first failure stops
+// new files from starting and is rethrown.
+const WINDOW = 64;
+
+async function indexWindowed<T>(items: T[], index: (item: T) => Promise<EmbedResult>) {
+  let inserted = 0;
+  let skipped = 0;
+  let next = 0;
+  let failed = false;
+
+  const worker = async () => {
+    while (!failed && next < items.length) {
+      const item = items[next++];
+      try {
+        const res = await index(item);
+        inserted += res.inserted;
+        skipped += res.skipped;
+      } catch (e) {
+        failed = true;
+        throw e;
+      }
+    }
+  };
+  await Promise.all(Array.from({ length: Math.min(WINDOW, items.length) }, worker));
+
+  return { inserted, skipped };
+}
+
+// Walk extracted files under root and embed the allowed ones
+export async function indexProjectFiles(projectId: string, root: string) {
+  const allFiles = await getFilesRecursively(root);
+  const files = allFiles.filter(shouldIndex);
+
+  const indexer = createIndexer(projectId);
+  const { inserted, skipped } = await indexWindowed(files, indexer.indexFile);
+  forgetProjectAnswers(projectId);
+  forgetProjectRetrievals(projectId);
+
+  return { files: files.length, inserted, skipped };
+}
+
+// The zip entries indexZipEntries embeds, each with the path extractAllTo(root)
+// writes it to. Entry names are untrusted: extraction keeps them inside root,
+// so "./" and "../" segments resolve the same way here. `npm run check:zip-paths`
+// compares the two.
+export function zipIndexTargets(zip: AdmZip, root: string) {
+  return zip
+    .getEntries()
+    .filter((e) => !e.isDirectory && shouldIndex(e.entryName))
+    .map((entry) => ({ entry, file: path.join(root, path.join("/", entry.entryName)) }));
+}
+
+// Index an uploaded zip without extracting it; entries are read in memory.
+// Stored paths match what extraction under root would have produced.
+export async function indexZipEntries(projectId: string, zip: AdmZip, root: string) {
+  const entries = zipIndexTargets(zip, root);
+
+  const indexer = createIndexer(projectId);
+  const { inserted, skipped } = await indexWindowed(entries, async ({ entry, file }) =>
+    indexer.indexContent(file, entry.getData().toString("utf-8"))
+  );
+  forgetProjectAnswers(projectId);
+  forgetProjectRetrievals(projectId);
+
+  return { files: entries.length, inserted, skipped };
+}
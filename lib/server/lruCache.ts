@@ -0,0 +1,118 @@
+// lib/server/lruCache.ts
+
+// The Map-backed LRU behind the in-process caches (embeddings, sessions,
+// answers, speculation). Map insertion order is recency order: a read moves
+// the entry to the end and eviction walks from the front. Entries leave once
+// the cache holds more than maxEntries or maxSize (as measured by sizeOf), or
+// when ttlMs has passed since they were last read (or, with refreshOnRead
+// off, since they were written). onEvict sees capacity and expiry evictions,
+// not explicit deletes.
+
+export type LruOptions<V> = {
+  maxEntries?: number;
+  maxSize?: number;
+  sizeOf?: (value: V) => number;
+  ttlMs?: number;
+  refreshOnRead?: boolean;
+  onEvict?: (key: string, value: V) => void;
+};
+
+type Slot<V> = { value: V; size: number; touchedAt: number };
+
+export function createLruCache<V>(options: LruOptions<V> = {}) {
+  const {
+    maxEntries = Infinity,
+    maxSize = Infinity,
+    sizeOf = () => 0,
+    ttlMs = Infinity,
+    refreshOnRead = true,
+    onEvict,
+  } = options;
+  const slots = new Map<string, Slot<V>>();
+  let totalSize = 0;
+
+  const expired = (slot: Slot<V>, now: number) => now - slot.touchedAt >= ttlMs;
+
+  const remove = (key: string, slot: Slot<V>, evicted: boolean) => {
+    slots.delete(key);
+    totalSize -= slot.size;
+    if (evicted) onEvict?.(key, slot.value);
+  };
+
+  // drop expired entries from the front, then least recently used ones until
+  // `incoming` more size units (and one more entry) fit
+  const makeRoom = (incoming: number, adding: number) => {
+    const now = Date.now();
+    for (const [key, slot] of slots) {
+      const over = slots.size + adding > maxEntries || totalSize + incoming > maxSize;
+      if (!over && !expired(slot, now)) break;
+      remove(key, slot, true);
+    }
+  };
+
+  return {
+    get(key: string): V | undefined {
+      const slot = slots.get(key);
+      if (!slot) return undefined;
+      const now = Date.now();
+      if (expired(slot, now)) {
+        remove(key, slot, true);
+        return undefined;
+      }
+      slots.delete(key);
+      if (refreshOnRead) slot.touchedAt = now;
+      slots.set(key, slot);
+      return slot.value;
+    },
+
+    set(key: string, value: V) {
+      const existing = slots.get(key);
+      if (existing) remove(key, existing, false);
+      const size = sizeOf(value);
+      if (maxEntries <= 0 || size > maxSize) return;
+      makeRoom(size, 1);
+      slots.set(key, { value, size, touchedAt: Date.now() });
+      totalSize += size;
+    },
+
+    delete(key: string) {
+      const slot = slots.get(key);
+      if (!slot) return false;
+      remove(key, slot, false);
+      return true;
+    },
+
+    clear() {
+      slots.clear();
+      totalSize = 0;
+    },
+
+    // evict whatever is expired or over capacity without adding anything
+    sweep() {
+      makeRoom(0, 0);
+    },
+
+    *entries(): IterableIterator<[string, V]> {
+      for (const [key, slot] of [...slots]) yield [key, slot.value];
+    },
+
+    get count() {
+      return slots.size;
+    },
+
+    get size() {
+      return totalSize;
+    },
+  };
+}
+
+export type LruCache<V> = ReturnType<typeof createLruCache<V>>;
+
+// Read a non-negative number from the environment. Unlike `Number(x) || d`,
+// an explicit 0 is kept (callers use it to disable a cache or limit).
+export function envNumber(name: string, fallback: number) {
+  const raw = process.env[name];
+  if (raw === undefined || raw.trim() === "") return fallback;
+  const n = Number(raw);
+  return Number.isFinite(n) && n >= 0 ? n : fallback;
+}
@@ -0,0 +1,35 @@
+// lib/server/metrics.ts
+
+// In-process counters and timings, read back through /api/debug/metrics
+type Timing = { count: number; totalMs: number; maxMs: number };
+
+const globalRef = globalThis as typeof globalThis & {
+  __ttcMetrics?: Map<string, number>;
+  __ttcTimings?: Map<string, Timing>;
+};
+const counters = (globalRef.__ttcMetrics ??= new Map<string, number>());
+const timings = (globalRef.__ttcTimings ??= new Map<string, Timing>());
+
+export function increment(name: string, by = 1) {
+  counters.set(name, (counters.get(name) ?? 0) + by);
+}
+
+export function observe(name: string, ms: number) {
+  const t = timings.get(name) ?? { count: 0, totalMs: 0, maxMs: 0 };
+  t.count += 1;
+  t.totalMs += ms;
+  t.maxMs = Math.max(t.maxMs, ms);
+  timings.set(name, t);
+}
+
+export function metricsSnapshot() {
+  return Object.fromEntries([...counters.entries()].sort(([a], [b]) => a.localeCompare(b)));
+}
+
+export function timingsSnapshot() {
+  return Object.fromEntries(
+    [...timings.entries()]
+      .sort(([a], [b]) => a.localeCompare(b))
+      .map(([name, t]) => [name, { ...t, meanMs: t.totalMs / t.count }])
+  );
+}
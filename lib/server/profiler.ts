@@ -0,0 +1,148 @@
+// lib/server/profiler.ts
+import { Session } from "node:inspector";
+import { mkdir, readdir, readFile, rm, stat, writeFile } from "node:fs/promises";
+import path from "node:path";
+import crypto from "node:crypto";
+import type { NextRequest } from "next/server";
+import { getSecret } from "./secrets";
+
+// Opt-in CPU profiling around whole route handlers.
+// An admin request with `x-ttc-profile: 1` is profiled at full resolution;
+// PROFILE_SAMPLE_RATE (0..1) additionally profiles a random share of normal
+// traffic at a coarse sampling interval. Captures land in a bounded on-disk
+// ring buffer served by /api/debug/profiles.
+
+const isVercel = process.env.VERCEL === "1";
+const PROFILE_DIR =
+  process.env.PROFILE_DIR || (isVercel ? "/tmp/ttc-profiles" : path.join(process.cwd(), ".profiles"));
+const MAX_PROFILES = Number(process.env.PROFILE_MAX_FILES) || 20;
+const SAMPLE_RATE = Number(process.env.PROFILE_SAMPLE_RATE) || 0;
+const SAMPLED_INTERVAL_US = Number(process.env.PROFILE_SAMPLING_INTERVAL_US) || 10000;
+
+const ID_PATTERN = /^[\w-]+$/;
+
+// the inspector is process-wide, so only one capture runs at a time
+let active = false;
+
+export function isAdmin(req: NextRequest) {
+  const token = getSecret("TTC_ADMIN_TOKEN");
+  if (!token) return false;
+  const given = Buffer.from(req.headers.get("authorization") ?? "");
+  const expected = Buffer.from(`Bearer ${token}`);
+  return given.length === expected.length && crypto.timingSafeEqual(given, expected);
+}
+
+function post(session: Session, method: string, params?: object) {
+  return new Promise<object | undefined>((resolve, reject) => {
+    session.post(method, params, (err, result) => (err ? reject(err) : resolve(result)));
+  });
+}
+
+async function saveProfile(id: string, profile: unknown) {
+  await mkdir(PROFILE_DIR, { recursive: true });
+  await writeFile(path.join(PROFILE_DIR, `${id}.cpuprofile`), JSON.stringify(profile));
+
+  // ring buffer: drop the oldest captures beyond the limit
+  const all = (await listProfiles()).slice(MAX_PROFILES);
+  await Promise.all(all.map((p) => rm(path.join(PROFILE_DIR, `${p.id}.cpuprofile`), { force: true })));
+  return id;
+}
+
+export async function withProfiling(req: NextRequest, label: string, run: () => Promise<Response>) {
+  const requested = req.headers.get("x-ttc-profile") === "1" && isAdmin(req);
+  const sampled = !requested && SAMPLE_RATE > 0 && Math.random() < SAMPLE_RATE;
+  if ((!requested && !sampled) || active) return run();
+
+  active = true;
+  const session = new Session();
+  try {
+    session.connect();
+    await post(session, "Profiler.enable");
+    if (sampled) await post(session, "Profiler.setSamplingInterval", { interval: SAMPLED_INTERVAL_US });
+    await post(session, "Profiler.start");
+  } catch (e) {
+    console.error("Profiler start error:", e);
+    session.disconnect();
+    active = false;
+    return run();
+  }
+
+  // the id is fixed up front so it can go out in the headers of a response
+  // whose body (and capture) is still streaming
+  const id = `${Date.now()}-${label}-${crypto.randomBytes(3).toString("hex")}`;
+  let stopped = false;
+  const stop = async () => {
+    if (stopped) return;
+    stopped = true;
+    try {
+      const result = (await post(session, "Profiler.stop")) as { profile?: unknown } | undefined;
+      await saveProfile(id, result?.profile);
+    } catch (e) {
+      console.error("Profiler save error:", e);
+    } finally {
+      session.disconnect();
+      active = false;
+    }
+  };
+
+  let response: Response;
+  try {
+    response = await run();
+  } catch (e) {
+    await stop();
+    throw e;
+  }
+  if (requested) response.headers.set("x-ttc-profile-id", id);
+  if (!response.body) {
+    await stop();
+    return response;
+  }
+
+  // A streamed handler keeps working after run() returns, so the capture
+  // ends when the body has been fully sent (or the client goes away)
+  const reader = response.body.getReader();
+  const body = new ReadableStream<Uint8Array>({
+    async pull(controller) {
+      try {
+        const { value, done } = await reader.read();
+        if (!done) return controller.enqueue(value);
+        controller.close();
+      } catch (e) {
+        controller.error(e);
+      }
+      await stop();
+    },
+    async cancel(reason) {
+      await reader.cancel(reason).catch(() => {});
+      await stop();
+    },
+  });
+  return new Response(body, { status: response.status, statusText: response.statusText, headers: response.headers });
+}
+
+export async function listProfiles() {
+  let names: string[];
+  try {
+    names = await readdir(PROFILE_DIR);
+  } catch {
+    return [];
+  }
+  const profiles = await Promise.all(
+    names
+      .filter((n) => n.endsWith(".cpuprofile"))
+      .map(async (n) => {
+        const s = await stat(path.join(PROFILE_DIR, n));
+        return { id: n.slice(0, -".cpuprofile".length), bytes: s.size, at: s.mtimeMs };
+      })
+  );
+  return profiles.sort((a, b) => b.at - a.at);
+}
+
+export async function readProfile(id: string) {
+  if (!ID_PATTERN.test(id)) return null;
+  try {
+    return await readFile(path.join(PROFILE_DIR, `${id}.cpuprofile`));
+  } catch {
+    return null;
+  }
+}
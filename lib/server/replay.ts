@@ -0,0 +1,52 @@
+// lib/server/replay.ts
+import type { AuditRecord } from "./audit";
+
+// Re-evaluate retrieval policies against recorded pre-threshold scores
+// (AUDIT_RAW_SCORES=1) without touching Supabase or OpenAI. Scores are packed
+// into one flat typed array, so each candidate policy is a single pass.
+
+export type Policy = { threshold: number; matchCount: number; cascadeMargin: number | null };
+
+export type PolicyOutcome = Policy & {
+  requests: number;
+  noContextRate: number;
+  meanSources: number;
+  cheapShare: number | null;
+};
+
+export type ScoreMatrix = { rows: number; width: number; scores: Float32Array };
+
+// rows x width matrix, padded with NaN where fewer scores were recorded
+export function packScores(records: AuditRecord[]): ScoreMatrix {
+  const withScores = records.filter((r) => Array.isArray(r.scores));
+  const width = withScores.reduce((w, r) => Math.max(w, r.scores!.length), 0);
+  const scores = new Float32Array(withScores.length * width).fill(NaN);
+  withScores.forEach((r, i) => scores.set(r.scores!, i * width));
+  return { rows: withScores.length, width, scores };
+}
+
+// Scores are stored best-first, so a row's sources are its leading scores
+// that clear the threshold, capped at matchCount.
+export function evaluatePolicy(m: ScoreMatrix, policy: Policy): PolicyOutcome {
+  const limit = Math.min(policy.matchCount, m.width);
+  let noContext = 0;
+  let totalSources = 0;
+  let cheap = 0;
+
+  for (let row = 0; row < m.rows; row++) {
+    const base = row * m.width;
+    let n = 0;
+    while (n < limit && m.scores[base + n] >= policy.threshold) n++;
+    totalSources += n;
+    if (n === 0) noContext++;
+    if (policy.cascadeMargin !== null && n > 0 && m.scores[base] >= policy.threshold + policy.cascadeMargin) cheap++;
+  }
+
+  return {
+    ...policy,
+    requests: m.rows,
+    noContextRate: m.rows ? noContext / m.rows : 0,
+    meanSources: m.rows ? totalSources / m.rows : 0,
+    cheapShare: policy.cascadeMargin === null ? null : m.rows ? cheap / m.rows : 0,
+  };
+}
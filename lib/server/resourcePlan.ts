@@ -0,0 +1,86 @@
+// lib/server/resourcePlan.ts
+import { readFileSync } from "node:fs";
+import os from "node:os";
+
+// Startup-time concurrency plan. Containers often expose every host core to
+// os.availableParallelism() while a cgroup quota allows only a few, and
+// several server instances may share that quota. Concurrency for indexing is
+// sized from what one instance can actually use. Env vars override each knob.
+
+export type ResourcePlan = {
+  cpus: number;
+  cpuSource: "cgroup" | "os";
+  instances: number;
+  cpusPerInstance: number;
+  threadpool: number;
+  fileConcurrency: number;
+  embedConcurrency: number;
+};
+
+function readNumbers(file: string) {
+  try {
+    return readFileSync(file, "utf-8").trim().split(/\s+/);
+  } catch {
+    return null;
+  }
+}
+
+export function detectCpuQuota(): { cpus: number; source: "cgroup" | "os" } {
+  const hostCpus = os.availableParallelism();
+
+  // cgroup v2: "<quota> <period>" or "max <period>"
+  const v2 = readNumbers("/sys/fs/cgroup/cpu.max");
+  if (v2 && v2[0] !== "max") {
+    const cpus = Number(v2[0]) / Number(v2[1]);
+    if (cpus > 0) return { cpus: Math.min(cpus, hostCpus), source: "cgroup" };
+  }
+
+  // cgroup v1: quota is -1 when unlimited
+  const quota = readNumbers("/sys/fs/cgroup/cpu/cpu.cfs_quota_us");
+  const period = readNumbers("/sys/fs/cgroup/cpu/cpu.cfs_period_us");
+  if (quota && period && Number(quota[0]) > 0) {
+    const cpus = Number(quota[0]) / Number(period[0]);
+    if (cpus > 0) return { cpus: Math.min(cpus, hostCpus), source: "cgroup" };
+  }
+
+  return { cpus: hostCpus, source: "os" };
+}
+
+function envInt(name: string) {
+  const n = Number(process.env[name]);
+  return Number.isInteger(n) && n > 0 ? n : null;
+}
+
+let cached: ResourcePlan | null = null;
+
+export function planResources(): ResourcePlan {
+  if (cached) return cached;
+
+  const { cpus, source } = detectCpuQuota();
+  const instances = envInt("WEB_CONCURRENCY") ?? 1;
+  const cpusPerInstance = Math.max(1, Math.floor(cpus / instances));
+
+  cached = {
+    cpus,
+    cpuSource: source,
+    instances,
+    cpusPerInstance,
+    // libuv serves fs + crypto; it only reads UV_THREADPOOL_SIZE at first use,
+    // so this is a recommendation for the environment, not applied here
+    threadpool: envInt("UV_THREADPOOL_SIZE") ?? Math.min(16, Math.max(4, cpusPerInstance * 2)),
+    // reading and hashing files is CPU/disk work
+    fileConcurrency: envInt("INDEX_FILE_CONCURRENCY") ?? Math.max(2, cpusPerInstance * 2),
+    // embedding calls mostly wait on the network; cap to stay inside rate limits
+    embedConcurrency: envInt("EMBED_CONCURRENCY") ?? Math.min(8, Math.max(2, cpusPerInstance * 2)),
+  };
+  return cached;
+}
+
+export function describePlan(plan: ResourcePlan) {
+  return (
+    `[resources] cpus=${plan.cpus.toFixed(2)} (${plan.cpuSource}) instances=${plan.instances} ` +
+    `perInstance=${plan.cpusPerInstance} fileConcurrency=${plan.fileConcurrency} ` +
+    `embedConcurrency=${plan.embedConcurrency} UV_THREADPOOL_SIZE=${plan.threadpool}` +
+    (process.env.UV_THREADPOOL_SIZE ? "" : " (recommended; not set)")
+  );
+}
@@ -0,0 +1,68 @@
+// lib/server/secrets.ts
+import { readFileSync } from "node:fs";
+import { readFile } from "node:fs/promises";
+import { increment } from "./metrics";
+
+// Secrets are resolved once per process and served from memory.
+// With TTC_SECRETS_FILE set they come from a local JSON file
+// ({ "OPENAI_API_KEY": "...", ... }), which stands in for a secrets manager
+// offline and in tests; names missing from the file fall back to the
+// environment. Once SECRETS_TTL_MS has passed, a read still returns the cached
+// value and starts a single background reload, so no request ever waits on it.
+// Clients resolve their keys here on every call, so a reload that rotates a
+// key gets a new client from the registry.
+
+const SECRETS_FILE = process.env.TTC_SECRETS_FILE || "";
+const TTL_MS = Number(process.env.SECRETS_TTL_MS) || 5 * 60 * 1000;
+
+type SecretState = {
+  values: Record<string, string>;
+  loadedAt: number;
+  refreshing: Promise<void> | null;
+};
+
+function parse(text: string) {
+  const parsed = JSON.parse(text) as Record<string, unknown>;
+  return Object.fromEntries(
+    Object.entries(parsed).filter((e): e is [string, string] => typeof e[1] === "string")
+  );
+}
+
+function loadInitial(): SecretState {
+  let values: Record<string, string> = {};
+  if (SECRETS_FILE) {
+    try {
+      values = parse(readFileSync(SECRETS_FILE, "utf-8"));
+    } catch (e: unknown) {
+      increment("secrets.load_failed");
+      console.error("Secrets file error:", e instanceof Error ? e.message : e);
+    }
+  }
+  return { values, loadedAt: Date.now(), refreshing: null };
+}
+
+// Survive Next dev hot reloads: one cache per process, not per module copy
+const globalRef = globalThis as typeof globalThis & { __ttcSecrets?: SecretState };
+const state = (globalRef.__ttcSecrets ??= loadInitial());
+
+async function refresh() {
+  try {
+    state.values = parse(await readFile(SECRETS_FILE, "utf-8"));
+    increment("secrets.refreshed");
+  } catch (e: unknown) {
+    // keep serving the last good values; try again after another TTL
+    increment("secrets.refresh_failed");
+    console.error("Secrets refresh error:", e instanceof Error ? e.message : e);
+  } finally {
+    state.loadedAt = Date.now();
+  }
+}
+
+export function getSecret(name: string): string | undefined {
+  if (SECRETS_FILE && !state.refreshing && Date.now() - state.loadedAt > TTL_MS) {
+    state.refreshing = refresh().finally(() => {
+      state.refreshing = null;
+    });
+  }
+  return state.values[name] ?? process.env[name];
+}
@@ -0,0 +1,58 @@
+// lib/server/sessions.ts
+import crypto from "node:crypto";
+import { createLruCache, LruCache } from "./lruCache";
+
+// Chat sessions negotiated once via /api/session and reused by /api/ask.
+// A session pins the project and retrieval settings and remembers the chunks
+// retrieved for earlier turns, so a repeated question skips embed + search.
+// Sessions are in-memory per instance; callers always keep enough to fall
+// back to a stateless ask if their session is gone.
+
+const SESSION_TTL_MS = Number(process.env.SESSION_TTL_MS) || 30 * 60 * 1000;
+const MAX_SESSIONS = 1000;
+const MAX_TURNS_CACHED = 50;
+
+export type RetrievedChunk = { id: string; filename: string; content: string; similarity: number };
+
+export type ChatSession = {
+  id: string;
+  projectId: string;
+  lastUsedAt: number;
+  retrievals: LruCache<RetrievedChunk[]>;
+};
+
+const globalRef = globalThis as typeof globalThis & { __ttcSessions?: LruCache<ChatSession> };
+const sessions = (globalRef.__ttcSessions ??= createLruCache<ChatSession>({
+  maxEntries: MAX_SESSIONS,
+  ttlMs: SESSION_TTL_MS,
+}));
+
+export function createSession(projectId: string) {
+  sessions.sweep();
+  const session: ChatSession = {
+    id: crypto.randomUUID(),
+    projectId,
+    lastUsedAt: Date.now(),
+    retrievals: createLruCache<RetrievedChunk[]>({ maxEntries: MAX_TURNS_CACHED }),
+  };
+  sessions.set(session.id, session);
+  return session;
+}
+
+export function getSession(id: string) {
+  const session = sessions.get(id);
+  if (!session) return null;
+  session.lastUsedAt = Date.now();
+  return session;
+}
+
+export function rememberRetrieval(session: ChatSession, questionHash: string, chunks: RetrievedChunk[]) {
+  session.retrievals.set(questionHash, chunks);
+}
+
+// Retrievals cached before a re-index point at stale chunks
+export function forgetProjectRetrievals(projectId: string) {
+  for (const [, session] of sessions.entries()) {
+    if (session.projectId === projectId) session.retrievals.clear();
+  }
+}
@@ -0,0 +1,82 @@
+// lib/server/shadow.ts
+import type { ChatCompletionMessageParam } from "openai/resources/chat/completions";
+import { EMBEDDING_MODEL, getOpenAI } from "../supabase";
+import { recordAudit, AuditRecord, SHADOW_AGREEMENT_MIN } from "./audit";
+import { increment, observe } from "./metrics";
+import { cosine } from "./vectors";
+
+// Shadow evaluation of a candidate chat model. For a sampled share of
+// answered questions the candidate gets the exact same prompt off the
+// request path; its latency delta and how far its answer drifts from the
+// served one (cosine of the two answers' embeddings) go to metrics and the
+// audit log. The user only ever sees the primary answer.
+
+export const SHADOW_CHAT_MODEL = process.env.OPENAI_SHADOW_CHAT_MODEL || "";
+const SHADOW_SAMPLE_RATE = Number(process.env.SHADOW_SAMPLE_RATE) || 0;
+
+export function shouldShadow() {
+  return !!SHADOW_CHAT_MODEL && SHADOW_SAMPLE_RATE > 0 && Math.random() < SHADOW_SAMPLE_RATE;
+}
+
+export type ShadowInput = {
+  messages: ChatCompletionMessageParam[];
+  answer: string;
+  chatMs: number;
+};
+
+type ShadowContext = Pick<AuditRecord, "projectId" | "configHash" | "questionHash" | "sources" | "topSimilarity">;
+
+export async function runShadow(primary: ShadowInput, context: ShadowContext) {
+  const started = Date.now();
+  const record = (status: number, latencyMs: number, latencyDeltaMs: number | null, agreement: number | null) =>
+    recordAudit({
+      ...context,
+      at: started,
+      route: "ask.shadow",
+      model: SHADOW_CHAT_MODEL,
+      status,
+      latencyMs,
+      shared: false,
+      scores: null,
+      latencyDeltaMs,
+      agreement,
+    });
+
+  let answer: string;
+  try {
+    const completion = await getOpenAI().chat.completions.create({
+      model: SHADOW_CHAT_MODEL,
+      temperature: 0.2,
+      messages: primary.messages,
+    });
+    answer = completion.choices[0]?.message?.content ?? "";
+  } catch (e: unknown) {
+    increment("shadow.failed");
+    record(502, Date.now() - started, null, null);
+    throw e;
+  }
+  const latencyMs = Date.now() - started;
+
+  // the embeddings API rejects empty input; an empty answer agrees with nothing
+  let agreement = 0;
+  if (answer.trim()) {
+    try {
+      const resp = await getOpenAI().embeddings.create({ model: EMBEDDING_MODEL, input: [primary.answer, answer] });
+      agreement = cosine(resp.data[0].embedding, resp.data[1].embedding);
+    } catch (e: unknown) {
+      increment("shadow.failed");
+      record(502, latencyMs, latencyMs - primary.chatMs, null);
+      throw e;
+    }
+  } else {
+    increment("shadow.empty");
+  }
+
+  // both sides are observed so the mean delta reads straight off the timings
+  observe("shadow.primary_ms", primary.chatMs);
+  observe("shadow.candidate_ms", latencyMs);
+  increment("shadow.completed");
+  increment(latencyMs < primary.chatMs ? "shadow.faster" : "shadow.slower");
+  if (agreement < SHADOW_AGREEMENT_MIN) increment("shadow.disagreed");
+  record(200, latencyMs, latencyMs - primary.chatMs, agreement);
+}
@@ -0,0 +1,14 @@
+// lib/server/singleFlight.ts
+
+// Collapse concurrent calls with the same key onto one in-flight promise.
+// Only the window while the leader runs is shared; nothing is cached after.
+const inflight = new Map<string, Promise<unknown>>();
+
+export async function singleFlight<T>(key: string, run: () => Promise<T>) {
+  const pending = inflight.get(key) as Promise<T> | undefined;
+  if (pending) return { value: await pending, shared: true };
+
+  const promise = run().finally(() => inflight.delete(key));
+  inflight.set(key, promise);
+  return { value: await promise, shared: false };
+}
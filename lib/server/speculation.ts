@@ -0,0 +1,40 @@
+// lib/server/speculation.ts
+import { increment } from "./metrics";
+import { createLruCache, LruCache } from "./lruCache";
+
+// Bookkeeping for speculative retrieval: the client sends the question it is
+// typing to /api/ask/speculate, and the server embeds (and, with a session,
+// searches) ahead of the real ask. A speculation is "used" when an ask for the
+// same project + question arrives within SPECULATION_TTL_MS, and "wasted" when
+// it expires or is evicted first.
+
+const SPECULATION_TTL_MS = Number(process.env.SPECULATION_TTL_MS) || 60_000;
+const MAX_PENDING = 1000;
+
+const globalRef = globalThis as typeof globalThis & { __ttcSpeculations?: LruCache<true> };
+const pending = (globalRef.__ttcSpeculations ??= createLruCache<true>({
+  maxEntries: MAX_PENDING,
+  ttlMs: SPECULATION_TTL_MS,
+  refreshOnRead: false,
+  onEvict: () => increment("ask.speculation.wasted"),
+}));
+
+const keyOf = (projectId: string, questionHash: string) => `${projectId}:${questionHash}`;
+
+export function noteSpeculation(projectId: string, questionHash: string) {
+  pending.sweep();
+  const key = keyOf(projectId, questionHash);
+  // re-sending the same text (e.g. after a pause) is one speculation, not two
+  if (pending.delete(key)) increment("ask.speculation.repeated");
+  else increment("ask.speculation.started");
+  pending.set(key, true);
+}
+
+export function claimSpeculation(projectId: string, questionHash: string) {
+  const key = keyOf(projectId, questionHash);
+  // an expired entry is evicted (and counted as wasted) by get()
+  if (!pending.get(key)) return false;
+  pending.delete(key);
+  increment("ask.speculation.used");
+  return true;
+}
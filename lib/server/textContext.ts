@@ -0,0 +1,60 @@
+// lib/server/textContext.ts
+import crypto from "node:crypto";
+
+export function sha256(text: string) {
+  return crypto.createHash("sha256").update(text).digest("hex");
+}
+
+// naive char-based chunking (tunable)
+export function chunkText(input: string, size = 2000, overlap = 200) {
+  const chunks: string[] = [];
+  for (let i = 0; i < input.length; i += size - overlap) {
+    chunks.push(input.slice(i, i + size));
+  }
+  return chunks;
+}
+
+export type Chunk = { hash: string; content: string };
+
+// Per-request view over one piece of text. Hashes, chunks and embeddings are
+// computed lazily on first use and memoized, so every step of a request reads
+// the same result instead of redoing the pass.
+export type TextContext = {
+  readonly text: string;
+  hash(): string;
+  chunks(size?: number, overlap?: number): Chunk[];
+  embedding(model: string, embed: (text: string) => Promise<number[]>): Promise<number[]>;
+};
+
+export function createTextContext(text: string): TextContext {
+  let hash: string | undefined;
+  const chunkSets = new Map<string, Chunk[]>();
+  const embeddings = new Map<string, Promise<number[]>>();
+
+  return {
+    text,
+    hash() {
+      if (hash === undefined) hash = sha256(text);
+      return hash;
+    },
+    chunks(size = 2000, overlap = 200) {
+      const key = `${size}:${overlap}`;
+      let set = chunkSets.get(key);
+      if (!set) {
+        set = chunkText(text, size, overlap).map((c) => ({ hash: sha256(c), content: c }));
+        chunkSets.set(key, set);
+      }
+      return set;
+    },
+    embedding(model, embed) {
+      let pending = embeddings.get(model);
+      if (!pending) {
+        pending = embed(text);
+        // a failed call must not poison the context for a retry
+        pending.catch(() => embeddings.delete(model));
+        embeddings.set(model, pending);
+      }
+      return pending;
+    },
+  };
+}
@@ -0,0 +1,24 @@
+// lib/server/vectors.ts
+
+// must match the documents.embedding vector(1536) column
+export const EMBEDDING_DIMENSIONS = 1536;
+
+// pgvector stores float32, but JSON.stringify prints each float32 value as
+// the shortest *double* that round-trips, often 17+ digits. Nine significant
+// digits always round-trip a float32, so the literal is ~35% smaller and
+// parses back to the exact same stored vector.
+export function toVectorLiteral(vector: number[]) {
+  return "[" + vector.map((x) => x.toPrecision(9)).join(",") + "]";
+}
+
+export function cosine(a: number[], b: number[]) {
+  let dot = 0;
+  let na = 0;
+  let nb = 0;
+  for (let i = 0; i < a.length; i++) {
+    dot += a[i] * b[i];
+    na += a[i] * a[i];
+    nb += b[i] * b[i];
+  }
+  return na && nb ? dot / Math.sqrt(na * nb) : 0;
+}
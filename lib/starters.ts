@@ -0,0 +1,7 @@
+// Suggested first questions in the chat panel; also prefetched by `npm run prefetch`
+export const starters = [
+  "List all endpoints and their handlers",
+  "Explain the main.cpp file",
+  "Where are environment variables read?",
+  "Show all React hooks used in the project",
+];
@@ -1,107 +1,246 @@
 // lib/supabase.ts
 import { createClient } from "@supabase/supabase-js";
-import OpenAI from "openai";
-import crypto from "node:crypto";
-
-export const supabase = createClient(
-process.env.SUPABASE_URL!,
-process.env.SUPABASE_ANON_KEY!
-);
-
-// One shared OpenAI client
-export const openai = new OpenAI({
-apiKey: process.env.OPENAI_API_KEY!,
-timeout: 10000,
-});
-
-const EMBEDDING_MODEL = "text-embedding-3-small";
-
-// naive char-based chunking (tunable)
-function chunkText(input: string, size = 2000, overlap = 200) {
-const chunks: string[] = [];
-for (let i = 0; i < input.length; i += size - overlap) {
-chunks.push(input.slice(i, i + size));
-}
-return chunks;
+import { getOpenAI } from "./openai";
+import { acquireClient } from "./server/clientRegistry";
+import { increment } from "./server/metrics";
+import { getSecret } from "./server/secrets";
+import { readArtifact } from "./server/artifactCache";
+import { EMBEDDING_DIMENSIONS, toVectorLiteral } from "./server/vectors";
+import { getCachedEmbedding, getCachedEmbeddings } from "./server/embeddingCache";
+import { createTextContext, TextContext } from "./server/textContext";
+
+// Resolved per call like the OpenAI client, so rotated credentials take effect
+export function getSupabase() {
+const settings = { url: getSecret("SUPABASE_URL"), key: getSecret("SUPABASE_ANON_KEY") };
+return acquireClient("supabase", settings, () => createClient(settings.url!, settings.key!));
 }
 
-function sha256(text: string) {
-return crypto.createHash("sha256").update(text).digest("hex");
-}
+// One shared OpenAI client, resolved through the registry
+export { getOpenAI };
+
+export const EMBEDDING_MODEL = "text-embedding-3-small";
+export { EMBEDDING_DIMENSIONS };
 
 // Batch embed (OpenAI supports array input)
 async function embedBatch(texts: string[]) {
-const resp = await openai.embeddings.create({
+const resp = await getOpenAI().embeddings.create({
 model: EMBEDDING_MODEL,
 input: texts,
 });
 return resp.data.map((d) => d.embedding);
 }
 
-// Embed a file into many chunks; skip duplicates by sha256
-export async function embedFileToProject(
-projectId: string,
-absPath: string,
-filename: string,
-content: string
-) {
-const chunks = chunkText(content);
-if (chunks.length === 0) return { inserted: 0, skipped: 0 };
+// Look up embeddings of chunks any project already stored, keyed by sha256.
+// All rows share EMBEDDING_MODEL, so a matching hash means a matching vector.
+// The find_known_embeddings RPC (see README) returns one row per hash, however
+// many projects hold it. Vectors read back stay in pgvector's text form and
+// are inserted as-is.
+let knownLookupMissing = false;
+
+async function findKnownEmbeddings(hashes: string[]) {
+const known = new Map<string, string>();
+if (hashes.length === 0 || knownLookupMissing) return known;
+
+const { data, error } = await getSupabase().rpc("find_known_embeddings", { hashes });
+
+if (error) {
+// without the function, chunks are simply embedded fresh
+if (error.code === "PGRST202") {
+knownLookupMissing = true;
+console.warn("find_known_embeddings is not installed; cross-project embedding reuse is off");
+return known;
+}
+throw new Error("Supabase read error: " + error.message);
+}
+for (const row of (data || []) as { sha256: string; embedding: string | number[] }[]) {
+// pgvector columns come back from PostgREST as "[0.1,0.2,...]"
+known.set(row.sha256, typeof row.embedding === "string" ? row.embedding : toVectorLiteral(row.embedding));
+}
+return known;
+}
 
-// precompute hashes and detect existing
-const hashRows = chunks.map((c) => ({ hash: sha256(c), content: c }));
-const { data: existing, error: exErr } = await supabase
+export type EmbedResult = { inserted: number; skipped: number };
+
+type PendingFile = {
+remaining: number;
+inserted: number;
+skipped: number;
+resolve: (r: EmbedResult) => void;
+reject: (e: unknown) => void;
+};
+
+type PendingChunk = { path: string; filename: string; hash: string; content: string; file: PendingFile };
+
+// Store one batch of chunks (from any number of files) with a single existence
+// check, reuse lookup, embedding call and insert. A project keeps one row per
+// hash: only the first chunk with a given hash is inserted, later copies count
+// as skipped. Returns inserted flags.
+async function storeChunks(projectId: string, batch: PendingChunk[]) {
+const hashes = [...new Set(batch.map((c) => c.hash))];
+const { data: existing, error: exErr } = await getSupabase()
 .from("documents")
 .select("sha256")
-.in("sha256", hashRows.map((h) => h.hash))
+.in("sha256", hashes)
 .eq("project_id", projectId);
 
 if (exErr) throw new Error("Supabase read error: " + exErr.message);
 const existingSet = new Set((existing || []).map((r) => r.sha256));
 
-const toInsert = hashRows.filter((h) => !existingSet.has(h.hash));
-if (toInsert.length === 0) return { inserted: 0, skipped: chunks.length };
-
-// batch in groups to respect token/size constraints
-const BATCH = 32;
-let inserted = 0;
-
-for (let i = 0; i < toInsert.length; i += BATCH) {
-const slice = toInsert.slice(i, i + BATCH);
-const embeddings = await embedBatch(slice.map((s) => s.content));
-
-const rows = slice.map((s, idx) => ({
+const firstOfHash = new Set<PendingChunk>();
+for (const c of batch) {
+if (existingSet.has(c.hash)) continue;
+existingSet.add(c.hash);
+firstOfHash.add(c);
+}
+const toInsert = batch.filter((c) => firstOfHash.has(c));
+if (toInsert.length > 0) {
+// identical chunks already embedded for any project are copied, not re-embedded
+const known = await findKnownEmbeddings([...new Set(toInsert.map((c) => c.hash))]);
+if (known.size > 0) increment("embed.chunks.reused", known.size);
+
+const missing = new Map(toInsert.filter((c) => !known.has(c.hash)).map((c) => [c.hash, c.content]));
+const hashesToEmbed = [...missing.keys()];
+const fresh = hashesToEmbed.length > 0
+? await getCachedEmbeddings(EMBEDDING_MODEL, hashesToEmbed, (todo) => embedBatch(todo.map((h) => missing.get(h)!)), {
+store: false,
+})
+: [];
+hashesToEmbed.forEach((h, idx) => known.set(h, toVectorLiteral(fresh[idx])));
+
+const rows = toInsert.map((c) => ({
 project_id: projectId,
-path: absPath,
-filename,
-sha256: s.hash,
-content: s.content,
-embedding: embeddings[idx],
+path: c.path,
+filename: c.filename,
+sha256: c.hash,
+content: c.content,
+embedding: known.get(c.hash)!,
 }));
 
-const { error } = await supabase.from("documents").insert(rows);
+const { error } = await getSupabase().from("documents").insert(rows);
 if (error) throw new Error("Supabase insert error: " + error.message);
-inserted += rows.length;
 }
 
-return { inserted, skipped: chunks.length - inserted };
+return batch.map((c) => firstOfHash.has(c));
+}
+
+// Micro-batch chunks across files: chunks are cut into batches of
+// EMBED_BATCH_SIZE (or whatever has queued after EMBED_BATCH_WAIT_MS), so a
+// repo of many small files costs a few large calls instead of one per file.
+// Each add() resolves once all of that file's chunks are stored.
+const BATCH = Number(process.env.EMBED_BATCH_SIZE) || 96;
+const MAX_WAIT_MS = Number(process.env.EMBED_BATCH_WAIT_MS) || 25;
+
+export function createChunkBatcher(projectId: string, maxInFlight = 1) {
+let queue: PendingChunk[] = [];
+// hashes queued or stored by this batcher; with batches running side by side
+// the existence check alone cannot see a copy that another batch is inserting
+const claimed = new Set<string>();
+const ready: PendingChunk[][] = [];
+let running = 0;
+let timer: ReturnType<typeof setTimeout> | null = null;
+let idle: (() => void)[] = [];
+
+const settle = (batch: PendingChunk[], flags: boolean[]) => {
+batch.forEach((c, i) => {
+if (flags[i]) c.file.inserted += 1;
+else c.file.skipped += 1;
+c.file.remaining -= 1;
+if (c.file.remaining === 0) c.file.resolve({ inserted: c.file.inserted, skipped: c.file.skipped });
+});
+};
+
+const pump = () => {
+while (running < maxInFlight && ready.length > 0) {
+const batch = ready.shift()!;
+running += 1;
+storeChunks(projectId, batch)
+.then(
+(flags) => settle(batch, flags),
+(e: unknown) =>
+batch.forEach((c) => {
+// a retried file may claim the hash again
+claimed.delete(c.hash);
+c.file.reject(e);
+})
+)
+.finally(() => {
+running -= 1;
+pump();
+if (running === 0 && ready.length === 0 && queue.length === 0) {
+idle.forEach((done) => done());
+idle = [];
+}
+});
+}
+};
+
+const cut = (all: boolean) => {
+if (timer) {
+clearTimeout(timer);
+timer = null;
+}
+while (queue.length >= BATCH || (all && queue.length > 0)) ready.push(queue.splice(0, BATCH));
+if (queue.length > 0) timer = setTimeout(() => cut(true), MAX_WAIT_MS);
+pump();
+};
+
+return {
+add(absPath: string, filename: string, content: string | TextContext): Promise<EmbedResult> {
+const ctx = typeof content === "string" ? createTextContext(content) : content;
+const chunks = ctx.chunks();
+if (chunks.length === 0) return Promise.resolve({ inserted: 0, skipped: 0 });
+
+const fresh = chunks.filter((c) => {
+if (claimed.has(c.hash)) return false;
+claimed.add(c.hash);
+return true;
+});
+const skipped = chunks.length - fresh.length;
+if (fresh.length === 0) return Promise.resolve({ inserted: 0, skipped });
+
+return new Promise<EmbedResult>((resolve, reject) => {
+const file: PendingFile = { remaining: fresh.length, inserted: 0, skipped, resolve, reject };
+queue = queue.concat(fresh.map((c) => ({ path: absPath, filename, hash: c.hash, content: c.content, file })));
+cut(false);
+});
+},
+// Send whatever is queued and wait until every batch has finished
+flush(): Promise<void> {
+cut(true);
+if (running === 0 && ready.length === 0) return Promise.resolve();
+return new Promise<void>((done) => idle.push(done));
+},
+};
+}
+
+// Embed a query through the shared cache (also used to warm it ahead of an ask)
+export function embedQuery(query: string | TextContext) {
+const ctx = typeof query === "string" ? createTextContext(query) : query;
+return ctx.embedding(EMBEDDING_MODEL, (text) =>
+getCachedEmbedding(EMBEDDING_MODEL, ctx.hash(), async () => {
+// prefetched questions (npm run prefetch) load from disk without an API call
+const prefetched = await readArtifact<number[]>("embedding", EMBEDDING_MODEL, ctx.hash());
+if (prefetched) return prefetched;
+const resp = await getOpenAI().embeddings.create({ model: EMBEDDING_MODEL, input: text });
+return resp.data[0].embedding;
+})
+);
 }
 
 // Query top-N chunks for a project
 export async function searchRelevantChunks(
 projectId: string,
-query: string,
+query: string | TextContext,
 matchCount = 6,
 threshold = 0.85
 ) {
-const embedding = await openai.embeddings.create({
-model: EMBEDDING_MODEL,
-input: query,
-});
+const embedding = await embedQuery(query);
 
-const { data, error } = await supabase.rpc("match_documents", {
+// one vector per question: the raw array, since the compact literal only pays
+// off on bulk inserts and would add encode time on the ask path
+const { data, error } = await getSupabase().rpc("match_documents", {
 project: projectId,
-query_embedding: embedding.data[0].embedding,
+query_embedding: embedding,
 match_count: matchCount,
 match_threshold: threshold,
 });
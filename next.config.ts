@@ -1,7 +1,11 @@
 import type { NextConfig } from "next";
 
 const nextConfig: NextConfig = {
-  /* config options here */
+  // ship prefetched artifacts (npm run prefetch) with the routes that embed questions
+  outputFileTracingIncludes: {
+    "/api/ask": ["./.cache/artifacts/**/*"],
+    "/api/ask/speculate": ["./.cache/artifacts/**/*"],
+  },
 };
 
 export default nextConfig;
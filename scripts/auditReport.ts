@@ -0,0 +1,35 @@
+// scripts/auditReport.ts
+//
+// Summarize the /api/ask audit log per hour, plus shadow model runs.
+//
+//   npm run audit:report -- [--since 24h]
+import { config } from "dotenv";
+
+config({ path: ".env.local" });
+config();
+
+async function main() {
+  const argv = process.argv.slice(2);
+  const i = argv.indexOf("--since");
+
+  // lib modules read env at import time, so load them after dotenv
+  const { CHEAP_CHAT_MODEL } = await import("../lib/server/askConfig");
+  const { parseSince, readAudit, summarizeByHour, summarizeShadow } = await import("../lib/server/audit");
+  const since = parseSince(i >= 0 ? argv[i + 1] : undefined, "24h");
+
+  const all = await readAudit(Date.now() - since);
+  const rows = all.filter((r) => r.route !== "ask.shadow");
+  console.log(`${rows.length} audited requests`);
+  console.table(summarizeByHour(rows, CHEAP_CHAT_MODEL || undefined));
+
+  const shadow = summarizeShadow(all);
+  if (shadow.length) {
+    console.log("Shadow runs");
+    console.table(shadow);
+  }
+}
+
+main().catch((e) => {
+  console.error(e);
+  process.exit(1);
+});
@@ -0,0 +1,115 @@
+// scripts/benchIndexing.ts
+//
+// Sweep indexing concurrency on this machine and report the best setting.
+//
+//   npm run bench:indexing -- <dir> [--levels 1,2,4,8,16] [--rounds 3]
+//   OPENAI_BASE_URL=http://localhost:8080/v1 npm run bench:indexing -- <dir> --embed [--batches 16]
+//
+// By default it measures the local half of indexing (read, chunk, hash), so it
+// costs no API calls; use the winner for INDEX_FILE_CONCURRENCY. With --embed
+// it also sends the directory's chunks in EMBED_BATCH_SIZE batches (up to
+// --batches per level) to the configured embeddings endpoint at each level;
+// use that winner for EMBED_CONCURRENCY. Point OPENAI_BASE_URL at a stub to
+// measure the client side for free, or at the real API to find where its
+// rate limits start to bite.
+import { config } from "dotenv";
+import { readFile } from "node:fs/promises";
+import path from "node:path";
+import { getFilesRecursively } from "../lib/server/getFilesRecursively";
+import { shouldIndex } from "../lib/server/fileFilter";
+import { createTextContext } from "../lib/server/textContext";
+import { describePlan, planResources } from "../lib/server/resourcePlan";
+
+config({ path: ".env.local" });
+config();
+
+async function runOnce(files: string[], concurrency: number) {
+  let next = 0;
+  let chunks = 0;
+  const worker = async () => {
+    while (next < files.length) {
+      const content = await readFile(files[next++], "utf-8");
+      chunks += createTextContext(content).chunks().length;
+    }
+  };
+  const started = process.hrtime.bigint();
+  await Promise.all(Array.from({ length: concurrency }, worker));
+  return { ms: Number(process.hrtime.bigint() - started) / 1e6, chunks };
+}
+
+// Send every batch through `concurrency` workers, like the chunk batcher does
+async function embedOnce(batches: string[][], concurrency: number, embed: (input: string[]) => Promise<unknown>) {
+  let next = 0;
+  const worker = async () => {
+    while (next < batches.length) await embed(batches[next++]);
+  };
+  const started = process.hrtime.bigint();
+  await Promise.all(Array.from({ length: concurrency }, worker));
+  return Number(process.hrtime.bigint() - started) / 1e6;
+}
+
+async function sweepEmbedding(files: string[], levels: number[], maxBatches: number) {
+  // lib modules read env at import time, so load them after dotenv
+  const { EMBEDDING_MODEL, getOpenAI } = await import("../lib/supabase");
+  const batchSize = Number(process.env.EMBED_BATCH_SIZE) || 96;
+
+  const chunks: string[] = [];
+  for (const file of files) {
+    if (chunks.length >= batchSize * maxBatches) break;
+    chunks.push(...createTextContext(await readFile(file, "utf-8")).chunks().map((c) => c.content));
+  }
+  const batches: string[][] = [];
+  for (let i = 0; i < chunks.length && batches.length < maxBatches; i += batchSize) {
+    batches.push(chunks.slice(i, i + batchSize));
+  }
+  if (!batches.length) return;
+
+  const embed = (input: string[]) => getOpenAI().embeddings.create({ model: EMBEDDING_MODEL, input });
+  console.log(`embedding ${batches.length} batches of up to ${batchSize} chunks via ${process.env.OPENAI_BASE_URL || "api.openai.com"}`);
+  let best = { level: levels[0], chunksPerSec: 0 };
+  for (const level of levels) {
+    const ms = await embedOnce(batches, level, embed);
+    const chunksPerSec = (batches.flat().length * 1000) / ms;
+    console.log(`embed concurrency=${String(level).padStart(3)}  ${chunksPerSec.toFixed(0)} chunks/s`);
+    if (chunksPerSec > best.chunksPerSec) best = { level, chunksPerSec };
+  }
+  console.log(`best: EMBED_CONCURRENCY=${best.level} (${best.chunksPerSec.toFixed(0)} chunks/s)`);
+}
+
+async function main() {
+  const argv = process.argv.slice(2);
+  const dir = argv.find((a) => !a.startsWith("--"));
+  const opt = (name: string) => {
+    const i = argv.indexOf(name);
+    return i >= 0 ? argv[i + 1] : undefined;
+  };
+  if (!dir) {
+    console.error("Usage: npm run bench:indexing -- <dir> [--levels 1,2,4,8,16] [--rounds 3] [--embed [--batches 16]]");
+    process.exit(1);
+  }
+
+  const levels = (opt("--levels") ?? "1,2,4,8,16").split(",").map(Number).filter((n) => n > 0);
+  const rounds = Number(opt("--rounds")) || 3;
+  const files = (await getFilesRecursively(path.resolve(dir))).filter(shouldIndex);
+
+  console.log(describePlan(planResources()));
+  console.log(`${files.length} files, ${rounds} rounds per level`);
+
+  await runOnce(files, 1); // warm the page cache
+  let best = { level: levels[0], filesPerSec: 0 };
+  for (const level of levels) {
+    let total = 0;
+    for (let r = 0; r < rounds; r++) total += (await runOnce(files, level)).ms;
+    const filesPerSec = (files.length * rounds * 1000) / total;
+    console.log(`concurrency=${String(level).padStart(3)}  ${filesPerSec.toFixed(0)} files/s`);
+    if (filesPerSec > best.filesPerSec) best = { level, filesPerSec };
+  }
+  console.log(`best: INDEX_FILE_CONCURRENCY=${best.level} (${best.filesPerSec.toFixed(0)} files/s)`);
+
+  if (argv.includes("--embed")) await sweepEmbedding(files, levels, Number(opt("--batches")) || 16);
+}
+
+main().catch((e) => {
+  console.error(e);
+  process.exit(1);
+});
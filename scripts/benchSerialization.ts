@@ -0,0 +1,38 @@
+// scripts/benchSerialization.ts
+//
+// Payload size and encode CPU for embedding rows, before and after the
+// compact pgvector literal.
+//
+//   npm run bench:serialization -- [--rows 96] [--rounds 50]
+import { EMBEDDING_DIMENSIONS, toVectorLiteral } from "../lib/server/vectors";
+
+function opt(argv: string[], name: string, fallback: number) {
+  const i = argv.indexOf(name);
+  return i >= 0 ? Number(argv[i + 1]) || fallback : fallback;
+}
+
+// what the OpenAI SDK hands back: float32 values widened to doubles
+function fakeEmbedding() {
+  return Array.from(new Float32Array(EMBEDDING_DIMENSIONS).map(() => (Math.random() - 0.5) * 0.1));
+}
+
+function bench(label: string, rows: number, rounds: number, encode: (v: number[]) => unknown) {
+  const vectors = Array.from({ length: rows }, fakeEmbedding);
+  let bytes = 0;
+  const started = process.hrtime.bigint();
+  for (let r = 0; r < rounds; r++) {
+    const body = JSON.stringify(vectors.map((v) => ({ sha256: "x".repeat(64), embedding: encode(v) })));
+    bytes = Buffer.byteLength(body);
+  }
+  const ms = Number(process.hrtime.bigint() - started) / 1e6 / rounds;
+  return { label, rows, kbPerBatch: Math.round(bytes / 1024), msPerBatch: Number(ms.toFixed(2)) };
+}
+
+const argv = process.argv.slice(2);
+const rows = opt(argv, "--rows", 96);
+const rounds = opt(argv, "--rounds", 50);
+
+console.table([
+  bench("number[] (before)", rows, rounds, (v) => v),
+  bench("vector literal (after)", rows, rounds, toVectorLiteral),
+]);
@@ -0,0 +1,98 @@
+// scripts/calibrateCascade.ts
+//
+// Check how well the cheap chat model agrees with the full one before
+// turning the cascade on.
+//
+//   npm run calibrate:cascade -- questions.jsonl [--margin 0.03]
+//
+// Each input line is { "projectId": "...", "question": "...", "expected"?: "..." }.
+// Both models answer every question; agreement is the cosine similarity of
+// the two answers' embeddings (and of each answer to `expected` when given).
+// The report is split by the stage the cascade would have picked.
+import { config } from "dotenv";
+import { readFile } from "node:fs/promises";
+import { cosine } from "../lib/server/vectors";
+
+config({ path: ".env.local" });
+config();
+
+type Labelled = { projectId: string; question: string; expected?: string };
+type Row = { stage: "cheap" | "full"; agreement: number; cheapVsExpected?: number; fullVsExpected?: number };
+
+function mean(xs: number[]) {
+  return xs.length ? xs.reduce((s, x) => s + x, 0) / xs.length : NaN;
+}
+
+async function main() {
+  const argv = process.argv.slice(2);
+  const file = argv.find((a) => !a.startsWith("--"));
+  const marginIdx = argv.indexOf("--margin");
+  if (!file) {
+    console.error("Usage: npm run calibrate:cascade -- <questions.jsonl> [--margin 0.03]");
+    process.exit(1);
+  }
+
+  const { EMBEDDING_MODEL, getOpenAI, searchRelevantChunks } = await import("../lib/supabase");
+  const openai = getOpenAI();
+  const { buildMessages, CHAT_MODEL, CHEAP_CHAT_MODEL, CASCADE_MARGIN, MATCH_COUNT, MATCH_THRESHOLD, pickChatModel } =
+    await import("../lib/server/askConfig");
+  if (!CHEAP_CHAT_MODEL) {
+    console.error("Set OPENAI_CHAT_MODEL_CHEAP to the model you want to calibrate");
+    process.exit(1);
+  }
+  const margin = marginIdx >= 0 ? Number(argv[marginIdx + 1]) : CASCADE_MARGIN;
+
+  const answer = async (model: string, messages: ReturnType<typeof buildMessages>) => {
+    const completion = await openai.chat.completions.create({ model, temperature: 0.2, messages });
+    return completion.choices[0]?.message?.content ?? "";
+  };
+  const embed = async (texts: string[]) => {
+    const resp = await openai.embeddings.create({ model: EMBEDDING_MODEL, input: texts });
+    return resp.data.map((d) => d.embedding);
+  };
+
+  const lines = (await readFile(file, "utf-8")).split("\n").filter((l) => l.trim());
+  const rows: Row[] = [];
+
+  for (const line of lines) {
+    const item = JSON.parse(line) as Labelled;
+    const chunks = await searchRelevantChunks(item.projectId, item.question, MATCH_COUNT, MATCH_THRESHOLD);
+    const messages = buildMessages(item.question, chunks);
+    const { stage } = pickChatModel(chunks[0]?.similarity ?? null, MATCH_THRESHOLD, margin);
+
+    const [cheap, full] = await Promise.all([answer(CHEAP_CHAT_MODEL, messages), answer(CHAT_MODEL, messages)]);
+
+    // the embeddings API rejects empty input; an empty text agrees with nothing
+    const texts = item.expected ? [cheap, full, item.expected] : [cheap, full];
+    const present = texts.filter((t) => t.trim());
+    const embedded = present.length ? await embed(present) : [];
+    const vectors = texts.map((t) => (t.trim() ? embedded.shift()! : null));
+    const agree = (a: number[] | null, b: number[] | null) => (a && b ? cosine(a, b) : 0);
+
+    rows.push({
+      stage,
+      agreement: agree(vectors[0], vectors[1]),
+      cheapVsExpected: item.expected ? agree(vectors[0], vectors[2]) : undefined,
+      fullVsExpected: item.expected ? agree(vectors[1], vectors[2]) : undefined,
+    });
+  }
+
+  console.log(`cheap=${CHEAP_CHAT_MODEL} full=${CHAT_MODEL} threshold=${MATCH_THRESHOLD} margin=${margin}`);
+  for (const stage of ["cheap", "full"] as const) {
+    const group = rows.filter((r) => r.stage === stage);
+    const withExpected = group.filter((r) => r.cheapVsExpected !== undefined);
+    console.log(
+      `${stage.padEnd(5)} routed=${group.length}/${rows.length}` +
+        ` agreement=${mean(group.map((r) => r.agreement)).toFixed(3)}` +
+        (withExpected.length
+          ? ` cheapVsExpected=${mean(withExpected.map((r) => r.cheapVsExpected!)).toFixed(3)}` +
+            ` fullVsExpected=${mean(withExpected.map((r) => r.fullVsExpected!)).toFixed(3)}`
+          : "")
+    );
+  }
+}
+
+main().catch((e) => {
+  console.error(e);
+  process.exit(1);
+});
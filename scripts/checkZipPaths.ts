@@ -0,0 +1,68 @@
+// scripts/checkZipPaths.ts
+//
+// Check that indexing a zip in memory stores the same paths as extracting it.
+//
+//   npm run check:zip-paths
+//
+// Builds a zip with nested, "./"-prefixed, "../" and directory entries,
+// extracts it the way /api/upload does and compares zipIndexTargets() with
+// the indexable files found on disk. Exits non-zero on any difference.
+import AdmZip from "adm-zip";
+import { mkdtemp, rm } from "node:fs/promises";
+import os from "node:os";
+import path from "node:path";
+import { getFilesRecursively } from "../lib/server/getFilesRecursively";
+import { shouldIndex, zipIndexTargets } from "../lib/server/indexProject";
+
+const ENTRIES = [
+  "README.md",
+  "src/index.ts",
+  "./src/lib/util.ts",
+  "./notes.txt",
+  "nested/deep/er/main.py",
+  "nested/deep/er/./sibling.py",
+  "../escape.ts",
+  "a/../../up.ts",
+  "assets/logo.png",
+  "docs/",
+];
+
+async function main() {
+  const built = new AdmZip();
+  for (const name of ENTRIES) {
+    built.addFile(name, name.endsWith("/") ? Buffer.alloc(0) : Buffer.from(`// ${name}\n`));
+  }
+  // read it back from bytes, as the upload route does
+  const zip = new AdmZip(built.toBuffer());
+
+  const base = await mkdtemp(path.join(os.tmpdir(), "ttc-zip-paths-"));
+  try {
+    const root = path.join(base, "project");
+    zip.extractAllTo(root, true);
+
+    const fromZip = zipIndexTargets(zip, root).map((t) => t.file).sort();
+    const onDisk = (await getFilesRecursively(root)).filter(shouldIndex).sort();
+
+    const missing = onDisk.filter((f) => !fromZip.includes(f));
+    const extra = fromZip.filter((f) => !onDisk.includes(f));
+    const duplicated = fromZip.length !== new Set(fromZip).size;
+    console.log(`${zip.getEntries().length} entries, ${onDisk.length} indexable files extracted, ${fromZip.length} indexed in memory`);
+    for (const f of missing) console.log(`  only on disk:   ${path.relative(root, f)}`);
+    for (const f of extra) console.log(`  only from zip:  ${path.relative(root, f)}`);
+    if (duplicated) console.log("  the same path is indexed more than once");
+
+    if (missing.length || extra.length || duplicated) {
+      console.error("Stored paths differ from extracted paths");
+      process.exitCode = 1;
+    } else {
+      console.log("Stored paths match extracted paths");
+    }
+  } finally {
+    await rm(base, { recursive: true, force: true });
+  }
+}
+
+main().catch((e) => {
+  console.error(e);
+  process.exit(1);
+});
@@ -0,0 +1,140 @@
+// scripts/indexLocal.ts
+//
+// Bulk-index a local checkout into Supabase without the HTTP upload flow.
+//
+//   npm run index:local -- <dir> [--project <id>] [--name <name>] [--concurrency <n>]
+//
+// Files are embedded by a pool of concurrent workers in one process (the
+// work is network-bound, so extra processes buy nothing); the pool size
+// defaults to the resource plan's embed concurrency. Progress is
+// checkpointed under .index-runs/<projectId>.json: re-running with the same
+// --project resumes with the files not yet done. One JSON line per file is
+// appended to .index-runs/<projectId>.jsonl as it finishes.
+import { config } from "dotenv";
+import { appendFile, mkdir, readFile, rename, writeFile } from "node:fs/promises";
+import path from "node:path";
+import crypto from "node:crypto";
+import { planResources } from "../lib/server/resourcePlan";
+
+config({ path: ".env.local" });
+config();
+
+const RUNS_DIR = path.join(process.cwd(), ".index-runs");
+const CHECKPOINT_EVERY = 20;
+
+type Args = { dir: string; project?: string; name?: string; concurrency: number };
+type Checkpoint = { projectId: string; root: string; done: string[] };
+
+function parseArgs(argv: string[]): Args {
+  const args: Args = { dir: "", concurrency: planResources().embedConcurrency };
+  for (let i = 0; i < argv.length; i++) {
+    const a = argv[i];
+    if (a === "--project") args.project = argv[++i];
+    else if (a === "--name") args.name = argv[++i];
+    else if (a === "--concurrency") args.concurrency = Math.max(1, Number(argv[++i]) || 1);
+    else if (!args.dir) args.dir = a;
+  }
+  if (!args.dir) {
+    console.error("Usage: npm run index:local -- <dir> [--project <id>] [--name <name>] [--concurrency <n>]");
+    process.exit(1);
+  }
+  return args;
+}
+
+async function loadCheckpoint(file: string): Promise<Checkpoint | null> {
+  try {
+    return JSON.parse(await readFile(file, "utf-8")) as Checkpoint;
+  } catch {
+    return null;
+  }
+}
+
+async function main() {
+  const args = parseArgs(process.argv.slice(2));
+  // lib modules read env at import time, so load them after dotenv
+  const { createIndexer, ensureProject, shouldIndex } = await import("../lib/server/indexProject");
+  const { getFilesRecursively } = await import("../lib/server/getFilesRecursively");
+
+  const root = path.resolve(args.dir);
+  const projectId = args.project ?? crypto.randomUUID();
+  await mkdir(RUNS_DIR, { recursive: true });
+  const checkpointPath = path.join(RUNS_DIR, `${projectId}.json`);
+  const reportPath = path.join(RUNS_DIR, `${projectId}.jsonl`);
+
+  const previous = await loadCheckpoint(checkpointPath);
+  if (previous && previous.root !== root) {
+    console.error(`Checkpoint for ${projectId} was made for ${previous.root}, not ${root}`);
+    process.exit(1);
+  }
+  const done = new Set(previous?.done ?? []);
+
+  const dbError = await ensureProject(projectId, args.name);
+  if (dbError) {
+    console.error(dbError);
+    process.exit(1);
+  }
+
+  const files = (await getFilesRecursively(root))
+    .filter(shouldIndex)
+    .filter((f) => !done.has(path.relative(root, f)));
+  console.log(`Project ${projectId}: ${files.length} files to index (${done.size} already done)`);
+
+  // checkpoint writes are chained so they never interleave
+  let saving = Promise.resolve();
+  const saveCheckpoint = () => {
+    const snapshot: Checkpoint = { projectId, root, done: [...done] };
+    saving = saving.then(async () => {
+      const tmp = `${checkpointPath}.tmp`;
+      await writeFile(tmp, JSON.stringify(snapshot));
+      await rename(tmp, checkpointPath);
+    });
+    return saving;
+  };
+
+  // workers share one indexer so their chunks are batched together
+  const indexer = createIndexer(projectId);
+  let next = 0;
+  let sinceCheckpoint = 0;
+  const totals = { files: 0, inserted: 0, skipped: 0, failed: 0 };
+  const started = Date.now();
+
+  const worker = async () => {
+    while (next < files.length) {
+      const file = files[next++];
+      const rel = path.relative(root, file);
+      try {
+        const res = await indexer.indexFile(file);
+        done.add(rel);
+        totals.files += 1;
+        totals.inserted += res.inserted;
+        totals.skipped += res.skipped;
+        await appendFile(reportPath, JSON.stringify({ file: rel, ...res }) + "\n");
+      } catch (e: unknown) {
+        // left out of the checkpoint so the next run retries it
+        totals.failed += 1;
+        const error = e instanceof Error ? e.message : String(e);
+        console.error(`Failed ${rel}: ${error}`);
+        await appendFile(reportPath, JSON.stringify({ file: rel, error }) + "\n");
+      }
+      if (++sinceCheckpoint >= CHECKPOINT_EVERY) {
+        sinceCheckpoint = 0;
+        await saveCheckpoint();
+      }
+    }
+  };
+
+  await Promise.all(Array.from({ length: args.concurrency }, worker));
+  await saveCheckpoint();
+
+  const secs = (Date.now() - started) / 1000;
+  console.log(
+    `Done in ${secs.toFixed(1)}s: ${totals.files} files, ${totals.inserted} inserted, ` +
+      `${totals.skipped} skipped, ${totals.failed} failed`
+  );
+  if (totals.failed > 0) process.exitCode = 1;
+}
+
+main().catch((e) => {
+  console.error(e);
+  process.exit(1);
+});
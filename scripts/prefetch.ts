@@ -0,0 +1,85 @@
+// scripts/prefetch.ts
+//
+// Resolve every model the app uses and prefetch cacheable artifacts.
+//
+//   npm run prefetch -- [--questions extra.txt] [--optional]
+//
+// Checks that each configured model is reachable, embeds the chat starters
+// (plus one question per line from --questions) into the content-addressed
+// artifact cache, and writes manifest.json with dimensions and timings.
+// `npm run build` runs it with --optional before `next build` so the artifacts
+// ship with the server; --optional only warns when the API is unreachable
+// (e.g. no key in CI), and the build goes ahead without artifacts.
+import { config } from "dotenv";
+import { readFile } from "node:fs/promises";
+
+config({ path: ".env.local" });
+config();
+
+async function timed<T>(run: () => Promise<T>) {
+  const started = performance.now();
+  const value = await run();
+  return { value, ms: Math.round(performance.now() - started) };
+}
+
+const argv = process.argv.slice(2);
+const optional = argv.includes("--optional");
+
+async function main() {
+  const qi = argv.indexOf("--questions");
+
+  // lib modules read env at import time, so load them after dotenv
+  const { getOpenAI, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS } = await import("../lib/supabase");
+  const openai = getOpenAI();
+  const { CHAT_MODEL, CHEAP_CHAT_MODEL } = await import("../lib/server/askConfig");
+  const { ARTIFACT_DIR, writeArtifact, writeManifest } = await import("../lib/server/artifactCache");
+  const { sha256 } = await import("../lib/server/textContext");
+  const { starters } = await import("../lib/starters");
+
+  const models = [];
+  for (const [role, id] of [["embedding", EMBEDDING_MODEL], ["chat", CHAT_MODEL], ["chat-cheap", CHEAP_CHAT_MODEL]]) {
+    if (!id) continue;
+    try {
+      const { ms } = await timed(() => openai.models.retrieve(id));
+      models.push({ role, id, available: true, ms });
+    } catch (e: unknown) {
+      models.push({ role, id, available: false, error: e instanceof Error ? e.message : String(e) });
+    }
+  }
+
+  const extra = qi >= 0 ? (await readFile(argv[qi + 1], "utf-8")).split("\n").map((l) => l.trim()) : [];
+  const questions = [...new Set([...starters, ...extra].filter(Boolean))];
+
+  const { value: resp, ms: embedMs } = await timed(() =>
+    openai.embeddings.create({ model: EMBEDDING_MODEL, input: questions })
+  );
+  const embeddings = [];
+  for (const [i, question] of questions.entries()) {
+    const vector = resp.data[i].embedding;
+    if (vector.length !== EMBEDDING_DIMENSIONS) {
+      throw new Error(`${EMBEDDING_MODEL} returned ${vector.length} dims, expected ${EMBEDDING_DIMENSIONS}`);
+    }
+    const hash = sha256(question);
+    const file = await writeArtifact("embedding", EMBEDDING_MODEL, hash, vector);
+    embeddings.push({ question, hash, file });
+  }
+
+  await writeManifest({
+    createdAt: new Date().toISOString(),
+    models,
+    embedding: { model: EMBEDDING_MODEL, dimensions: EMBEDDING_DIMENSIONS, ms: embedMs, artifacts: embeddings },
+  });
+
+  console.table(models);
+  console.log(`${embeddings.length} question embeddings written to ${ARTIFACT_DIR} in ${embedMs}ms`);
+  if (!optional && models.some((m) => !m.available)) process.exitCode = 1;
+}
+
+main().catch((e) => {
+  if (optional) {
+    console.warn("Prefetch skipped:", e instanceof Error ? e.message : e);
+    return;
+  }
+  console.error(e);
+  process.exit(1);
+});
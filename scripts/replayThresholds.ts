@@ -0,0 +1,78 @@
+// scripts/replayThresholds.ts
+//
+// What-if analysis for retrieval thresholds over the audit log.
+// Needs records written with AUDIT_RAW_SCORES=1.
+//
+//   npm run replay:thresholds -- [--since 7d] [--threshold 0.85] [--count 6] [--margin 0.03]
+//   npm run replay:thresholds -- --sweep 0.70:0.95:0.01
+import { config } from "dotenv";
+
+config({ path: ".env.local" });
+config();
+
+async function main() {
+  const argv = process.argv.slice(2);
+  const opt = (name: string) => {
+    const i = argv.indexOf(name);
+    return i >= 0 ? argv[i + 1] : undefined;
+  };
+  const num = (name: string, fallback: number, valid: (n: number) => boolean, hint: string) => {
+    const raw = opt(name);
+    if (raw === undefined) return fallback;
+    const n = Number(raw);
+    if (raw.trim() === "" || !Number.isFinite(n) || !valid(n)) {
+      console.error(`${name} takes ${hint}, got ${raw}`);
+      process.exit(1);
+    }
+    return n;
+  };
+
+  // lib modules read env at import time, so load them after dotenv
+  const { CASCADE_MARGIN, CHEAP_CHAT_MODEL, MATCH_COUNT, MATCH_THRESHOLD } = await import("../lib/server/askConfig");
+  const { parseSince, readAudit } = await import("../lib/server/audit");
+  const { evaluatePolicy, packScores } = await import("../lib/server/replay");
+
+  const matrix = packScores(await readAudit(Date.now() - parseSince(opt("--since"), "7d")));
+  if (matrix.rows === 0) {
+    console.error("No audit records with raw scores; enable AUDIT_RAW_SCORES=1 and collect traffic first");
+    process.exit(1);
+  }
+
+  const current = {
+    threshold: MATCH_THRESHOLD,
+    matchCount: MATCH_COUNT,
+    cascadeMargin: CHEAP_CHAT_MODEL ? CASCADE_MARGIN : null,
+  };
+  const candidate = {
+    threshold: num("--threshold", current.threshold, (n) => n >= -1 && n <= 1, "a similarity between -1 and 1"),
+    matchCount: num("--count", current.matchCount, (n) => Number.isInteger(n) && n > 0, "a whole number greater than 0"),
+    cascadeMargin:
+      opt("--margin") !== undefined ? num("--margin", 0, (n) => n >= 0, "a number of 0 or more") : current.cascadeMargin,
+  };
+
+  const started = process.hrtime.bigint();
+  const outcomes = [evaluatePolicy(matrix, current)];
+
+  const sweep = opt("--sweep");
+  if (sweep) {
+    const [from, to, step] = sweep.split(":").map(Number);
+    if (![from, to, step].every(Number.isFinite) || step <= 0) {
+      console.error("--sweep takes from:to:step with a step greater than 0, e.g. 0.70:0.95:0.01");
+      process.exit(1);
+    }
+    for (let t = from; t <= to + 1e-9; t += step) {
+      outcomes.push(evaluatePolicy(matrix, { ...candidate, threshold: Number(t.toFixed(4)) }));
+    }
+  } else {
+    outcomes.push(evaluatePolicy(matrix, candidate));
+  }
+  const ms = Number(process.hrtime.bigint() - started) / 1e6;
+
+  console.log(`${matrix.rows} requests replayed in ${ms.toFixed(1)}ms (first row = current policy)`);
+  console.table(outcomes);
+}
+
+main().catch((e) => {
+  console.error(e);
+  process.exit(1);
+});